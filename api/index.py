@@ -1,12 +1,13 @@
-import os
+import asyncio
+import json
+from contextlib import asynccontextmanager
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from dotenv import load_dotenv
-from fastapi import FastAPI, Query, Request as FastAPIRequest
+from fastapi import Depends, FastAPI, Query, Request as FastAPIRequest
 from fastapi.middleware.cors import CORSMiddleware
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 from fastapi.responses import StreamingResponse
-from google import genai
 from utils.prompt import ClientMessage, convert_to_gemini_messages
 from utils.stream import (
     patch_response_with_headers,
@@ -14,19 +15,57 @@ from utils.stream import (
     stream_contextual_response,
 )
 from utils.tools import AVAILABLE_TOOLS, TOOL_DEFINITIONS
-from utils.contextual_llm import ContextualLLM
+from utils.chunker import count_tokens
+from utils.contextual_llm import AsyncContextualLLM
 from utils.company_metadata import (
+    AsyncChatHistory,
+    AsyncUserManager,
     CompanyMetadata,
+    AsyncCompanyDataStore,
     CompanyDataStore,
+    IngestManifest,
     UserManager,
-    ChatHistory,
 )
 from utils.ingestor import DataIngestor
+from utils.retriever import AsyncDataRetriever, SearchFilters
+from utils.resources import Resources
 
 
 load_dotenv(".env.local")
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    resources = Resources()
+    try:
+        await AsyncChatHistory(resources.async_mongo).ensure_indexes()
+    except Exception as e:
+        # Serve without them; they are created again on the next start
+        print(f"Could not create chat history indexes: {e}")
+    resources.history_writer.start()
+    app.state.resources = resources
+    await warn_legacy_collections(resources)
+    try:
+        yield
+    finally:
+        await resources.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+async def warn_legacy_collections(resources: Resources):
+    try:
+        legacy = await build_retriever(resources).legacy_companies()
+    except Exception as e:
+        print(f"Could not check collection layouts: {e}")
+        return
+    if legacy:
+        print(
+            f"WARNING: collections for {', '.join(legacy)} have a single unnamed "
+            "vector and only get dense search; re-ingest them with "
+            "`python -m api.utils.db_init --upgrade-legacy`"
+        )
 
 app.add_middleware(ProxyHeadersMiddleware, trusted_hosts="*")
 app.add_middleware(
@@ -42,7 +81,29 @@ class Request(BaseModel):
     messages: List[ClientMessage]
 
 
-class ContextualQueryRequest(BaseModel):
+class SearchFilterFields(BaseModel):
+    sources: Optional[List[str]] = None
+    sprint_from: Optional[int] = None
+    sprint_to: Optional[int] = None
+    bug_stages: Optional[List[str]] = None
+
+    @model_validator(mode="after")
+    def check_sprint_range(self):
+        if (
+            self.sprint_from is not None
+            and self.sprint_to is not None
+            and self.sprint_from > self.sprint_to
+        ):
+            raise ValueError("sprint_from must not be greater than sprint_to")
+        return self
+
+    def search_filters(self) -> SearchFilters:
+        return SearchFilters(
+            self.sources, self.sprint_from, self.sprint_to, self.bug_stages
+        )
+
+
+class ContextualQueryRequest(SearchFilterFields):
     company_id: str
     user_id: str
     task: str
@@ -50,6 +111,27 @@ class ContextualQueryRequest(BaseModel):
     use_context: bool = True
     limit: int = 10
     stream: bool = False
+    bypass_cache: bool = False
+    diversity: float = Field(0.0, ge=0, le=1)
+
+
+class BatchContextualQueryRequest(SearchFilterFields):
+    company_id: str
+    tasks: List[str]
+    use_context: bool = True
+    limit: int = 10
+    bypass_cache: bool = False
+    diversity: float = Field(0.0, ge=0, le=1)
+
+
+class SearchRequest(SearchFilterFields):
+    query: str
+    limit: int = 10
+    diversity: float = Field(0.0, ge=0, le=1)
+
+
+class FederatedSearchRequest(SearchRequest):
+    companies: Optional[List[str]] = None
 
 
 class UserRegistrationRequest(BaseModel):
@@ -70,15 +152,88 @@ class IngestDataRequest(BaseModel):
     data: List[dict]
 
 
+def get_resources(request: FastAPIRequest) -> Resources:
+    return request.app.state.resources
+
+
+def get_user_manager(resources: Resources = Depends(get_resources)) -> UserManager:
+    return UserManager(resources.mongo)
+
+
+def get_async_user_manager(
+    resources: Resources = Depends(get_resources),
+) -> AsyncUserManager:
+    return AsyncUserManager(resources.async_mongo)
+
+
+def get_async_chat_history(
+    resources: Resources = Depends(get_resources),
+) -> AsyncChatHistory:
+    return AsyncChatHistory(resources.async_mongo)
+
+
+def get_company_metadata_store(
+    resources: Resources = Depends(get_resources),
+) -> CompanyMetadata:
+    return CompanyMetadata(resources.mongo)
+
+
+def get_company_data_store(
+    resources: Resources = Depends(get_resources),
+) -> CompanyDataStore:
+    return CompanyDataStore(resources.mongo)
+
+
+def get_ingestor(resources: Resources = Depends(get_resources)) -> DataIngestor:
+    return DataIngestor(
+        resources.qdrant,
+        resources.ollama,
+        embed_batch_size=resources.settings.embed_batch_size,
+        embed_concurrency=resources.settings.embed_concurrency,
+        embedding_cache=resources.embedding_cache,
+        search_cache=resources.search_cache,
+        answer_cache=resources.answer_cache,
+        manifest=IngestManifest(resources.mongo),
+        slim_payloads=resources.settings.slim_payloads,
+        data_store=CompanyDataStore(resources.mongo),
+        quantization=resources.settings.quantization,
+        mrl_dims=resources.settings.mrl_dims,
+    )
+
+
+def build_retriever(resources: Resources) -> AsyncDataRetriever:
+    return AsyncDataRetriever(
+        resources.async_qdrant,
+        resources.async_ollama,
+        embedding_cache=resources.embedding_cache,
+        search_cache=resources.search_cache,
+        data_store=AsyncCompanyDataStore(resources.async_mongo),
+        local_indexes=resources.local_indexes,
+        oversampling=resources.settings.oversampling,
+    )
+
+
+def build_contextual_llm(resources: Resources) -> AsyncContextualLLM:
+    return AsyncContextualLLM(
+        client=resources.genai, retriever=build_retriever(resources)
+    )
+
+
 @app.post("/api/chat")
-async def handle_chat_data(request: Request, protocol: str = Query("data")):
+async def handle_chat_data(
+    request: Request,
+    protocol: str = Query("data"),
+    resources: Resources = Depends(get_resources),
+):
+    if resources.genai is None:
+        return {"success": False, "error": "GOOGLE_API_KEY is not configured"}
+
     messages = request.messages
     gemini_messages = convert_to_gemini_messages(messages)
 
-    client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
     response = StreamingResponse(
         stream_text(
-            client, gemini_messages, TOOL_DEFINITIONS, AVAILABLE_TOOLS, protocol
+            resources.genai, gemini_messages, TOOL_DEFINITIONS, AVAILABLE_TOOLS, protocol
         ),
         media_type="text/event-stream",
     )
@@ -87,64 +242,113 @@ async def handle_chat_data(request: Request, protocol: str = Query("data")):
 
 @app.post("/api/contextual-query")
 async def handle_contextual_query(
-    request: ContextualQueryRequest, protocol: str = Query("data")
+    request: ContextualQueryRequest,
+    protocol: str = Query("data"),
+    resources: Resources = Depends(get_resources),
+    user_manager: AsyncUserManager = Depends(get_async_user_manager),
+    chat_history: AsyncChatHistory = Depends(get_async_chat_history),
 ):
     try:
-        user_manager = UserManager()
-        user = user_manager.get_user(request.user_id)
+        user = await user_manager.get_user(request.user_id)
         if not user:
             return {"success": False, "error": "User not found"}
 
-        chat_history = ChatHistory()
-
         # Create or use existing session
         if request.session_id:
-            session = chat_history.get_session(request.session_id)
+            session = await chat_history.get_session(request.session_id)
             if not session:
                 return {"success": False, "error": "Session not found"}
             session_id = request.session_id
         else:
-            session_id = chat_history.create_session(request.user_id, request.company_id)
+            session_id = await chat_history.create_session(
+                request.user_id, request.company_id
+            )
 
-        # Store user message
-        chat_history.add_message(session_id, "user", request.task)
+        # Store user message, claiming the next slot for the reply so it
+        # stays ahead of any later message however late it is written
+        added = await chat_history.add_message(
+            session_id, "user", request.task, reserve_reply=True
+        )
+        if not added["success"]:
+            return added
+        reply_seq = added["reply_seq"]
 
-        llm = ContextualLLM()
-        client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+        llm = build_contextual_llm(resources)
 
-        # Build the prompt based on context
+        # Retrieve once; the same context feeds the prompt and the history
+        context = None
         if request.use_context:
-            context = llm.get_company_context(
-                request.company_id, request.task, request.limit
+            context = await llm.get_company_context(
+                request.company_id,
+                request.task,
+                request.limit,
+                request.search_filters(),
+                request.diversity,
             )
-            if context["raw_results"]:
-                prompt = llm.build_prompt(request.task, context)
-            else:
-                prompt = f"""No relevant past context found for this task.
+        prompt = llm.build_contextual_prompt(request.task, context)
+        metadata = {
+            "prompt_tokens": count_tokens(prompt),
+            "prompt_budget": llm.budget.max_tokens,
+        }
 
-User's task: {request.task}
+        # Paraphrased tasks that retrieved the same points reuse an answer
+        answer_cache = resources.answer_cache
+        use_answer_cache = context is not None and not request.bypass_cache
+        cached_answer = None
+        if use_answer_cache:
+            point_ids = [result.id for result in context["raw_results"]]
+            cached_answer = answer_cache.lookup(
+                request.company_id, context["query_embedding"], point_ids
+            )
 
-Provide general best practices and guidance."""
-        else:
-            prompt = request.task
+        def remember_answer(text: str):
+            if use_answer_cache and text:
+                answer_cache.store(
+                    request.company_id, context["query_embedding"], point_ids, text
+                )
+
+        def persist_reply(text: str, details: dict):
+            # Queued, not awaited: the stream is finishing or already gone
+            if text:
+                resources.history_writer.enqueue(
+                    session_id,
+                    reply_seq,
+                    "assistant",
+                    text,
+                    llm.context_used(context),
+                    details,
+                )
 
         # Handle streaming response
         if request.stream:
             response = StreamingResponse(
-                stream_contextual_response(client, prompt, llm.model_name, protocol),
+                stream_contextual_response(
+                    llm.client,
+                    prompt,
+                    llm.model_name,
+                    protocol,
+                    cached_response=cached_answer,
+                    on_complete=remember_answer,
+                    metadata=metadata,
+                    on_close=persist_reply,
+                ),
                 media_type="text/event-stream",
             )
             return patch_response_with_headers(response, protocol)
 
         # Handle non-streaming response
-        response_text = llm.ask(
-            company_id=request.company_id,
-            task=request.task,
-            use_context=request.use_context,
-        )
+        if cached_answer is not None:
+            response_text = cached_answer
+        else:
+            response_text, finished = await llm.generate_checked(prompt)
+            if finished:
+                remember_answer(response_text)
 
-        # Store assistant response
-        chat_history.add_message(session_id, "assistant", response_text)
+        # Store assistant response in its reserved slot
+        reply = chat_history.new_message(
+            "assistant", response_text, llm.context_used(context), seq=reply_seq
+        )
+        await chat_history.write_messages([(session_id, reply)])
 
         return {
             "success": True,
@@ -153,15 +357,100 @@ Provide general best practices and guidance."""
             "task": request.task,
             "response": response_text,
             "used_context": request.use_context,
+            "cached": cached_answer is not None,
+            "metadata": metadata,
         }
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
+@app.post("/api/contextual-query/batch")
+async def handle_batch_contextual_query(
+    request: BatchContextualQueryRequest,
+    resources: Resources = Depends(get_resources),
+):
+    """Answer many tasks for one company, streaming one NDJSON line per task
+    as it completes. Retrieval runs as one batch; generations run
+    concurrently up to GENAI_CONCURRENCY. Nothing is added to chat history."""
+    try:
+        if not request.tasks:
+            return {"success": False, "error": "No tasks given"}
+        max_tasks = resources.settings.batch_max_tasks
+        if len(request.tasks) > max_tasks:
+            return {"success": False, "error": f"At most {max_tasks} tasks per batch"}
+
+        llm = build_contextual_llm(resources)
+        contexts = [None] * len(request.tasks)
+        if request.use_context:
+            contexts = await llm.get_company_contexts(
+                request.company_id,
+                request.tasks,
+                request.limit,
+                request.search_filters(),
+                request.diversity,
+            )
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+    answer_cache = resources.answer_cache
+
+    async def answer(index: int, task: str, context: Optional[dict]) -> dict:
+        try:
+            prompt = llm.build_contextual_prompt(task, context)
+            use_answer_cache = context is not None and not request.bypass_cache
+            cached_answer = None
+            if use_answer_cache:
+                point_ids = [result.id for result in context["raw_results"]]
+                cached_answer = answer_cache.lookup(
+                    request.company_id, context["query_embedding"], point_ids
+                )
+
+            if cached_answer is not None:
+                response_text = cached_answer
+            else:
+                async with resources.genai_semaphore:
+                    response_text, finished = await llm.generate_checked(prompt)
+                if use_answer_cache and finished and response_text:
+                    answer_cache.store(
+                        request.company_id,
+                        context["query_embedding"],
+                        point_ids,
+                        response_text,
+                    )
+
+            return {
+                "success": True,
+                "index": index,
+                "task": task,
+                "response": response_text,
+                "cached": cached_answer is not None,
+                "context_used": llm.context_used(context),
+                "metadata": {"prompt_tokens": count_tokens(prompt)},
+            }
+        except Exception as e:
+            return {"success": False, "index": index, "task": task, "error": str(e)}
+
+    async def results():
+        pending = [
+            asyncio.create_task(answer(i, task, context))
+            for i, (task, context) in enumerate(zip(request.tasks, contexts))
+        ]
+        try:
+            for next_done in asyncio.as_completed(pending):
+                yield json.dumps(await next_done, default=str) + "\n"
+        finally:
+            # The client went away; don't keep generating for it
+            for task in pending:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
 @app.get("/api/companies")
-async def get_all_companies():
+def get_all_companies(
+    metadata: CompanyMetadata = Depends(get_company_metadata_store),
+):
     try:
-        metadata = CompanyMetadata()
         companies = metadata.get_all_companies()
         return {"success": True, "companies": companies}
     except Exception as e:
@@ -169,9 +458,10 @@ async def get_all_companies():
 
 
 @app.get("/api/companies/{company_id}/metadata")
-async def get_company_metadata(company_id: str):
+def get_company_metadata(
+    company_id: str, metadata: CompanyMetadata = Depends(get_company_metadata_store)
+):
     try:
-        metadata = CompanyMetadata()
         company_data = metadata.get_company_metadata(company_id)
         if not company_data:
             return {"success": False, "error": "Company not found"}
@@ -181,9 +471,11 @@ async def get_company_metadata(company_id: str):
 
 
 @app.post("/api/users/register")
-async def register_user(request: UserRegistrationRequest):
+def register_user(
+    request: UserRegistrationRequest,
+    user_manager: UserManager = Depends(get_user_manager),
+):
     try:
-        user_manager = UserManager()
         result = user_manager.create_user(name=request.name, email=request.email)
         return result
     except Exception as e:
@@ -191,10 +483,11 @@ async def register_user(request: UserRegistrationRequest):
 
 
 @app.get("/api/users/{user_id}")
-async def get_user(user_id: str):
+async def get_user(
+    user_id: str, user_manager: AsyncUserManager = Depends(get_async_user_manager)
+):
     try:
-        user_manager = UserManager()
-        user = user_manager.get_user(user_id)
+        user = await user_manager.get_user(user_id)
         if not user:
             return {"success": False, "error": "User not found"}
         return {"success": True, "user": user}
@@ -203,14 +496,16 @@ async def get_user(user_id: str):
 
 
 @app.get("/api/users/{user_id}/companies")
-async def get_user_companies(user_id: str):
+def get_user_companies(
+    user_id: str,
+    user_manager: UserManager = Depends(get_user_manager),
+    metadata: CompanyMetadata = Depends(get_company_metadata_store),
+):
     try:
-        user_manager = UserManager()
         user = user_manager.get_user(user_id)
         if not user:
             return {"success": False, "error": "User not found"}
 
-        metadata = CompanyMetadata()
         companies = metadata.get_user_companies(user_id)
         return {"success": True, "user_id": user_id, "companies": companies}
     except Exception as e:
@@ -218,14 +513,17 @@ async def get_user_companies(user_id: str):
 
 
 @app.post("/api/companies/create")
-async def create_company(request: CreateCompanyRequest):
+def create_company(
+    request: CreateCompanyRequest,
+    user_manager: UserManager = Depends(get_user_manager),
+    metadata: CompanyMetadata = Depends(get_company_metadata_store),
+    ingestor: DataIngestor = Depends(get_ingestor),
+):
     try:
-        user_manager = UserManager()
         user = user_manager.get_user(request.user_id)
         if not user:
             return {"success": False, "error": "User not found"}
 
-        metadata = CompanyMetadata()
         result = metadata.create_company(
             company_id=request.company_id,
             name=request.name,
@@ -238,7 +536,6 @@ async def create_company(request: CreateCompanyRequest):
         if not result.get("success"):
             return result
 
-        ingestor = DataIngestor()
         ingestor.setup_company(request.company_id)
 
         return {
@@ -252,17 +549,20 @@ async def create_company(request: CreateCompanyRequest):
 
 
 @app.post("/api/companies/{company_id}/ingest")
-async def ingest_company_data(company_id: str, request: IngestDataRequest):
+def ingest_company_data(
+    company_id: str,
+    request: IngestDataRequest,
+    metadata: CompanyMetadata = Depends(get_company_metadata_store),
+    ingestor: DataIngestor = Depends(get_ingestor),
+    data_store: CompanyDataStore = Depends(get_company_data_store),
+):
     try:
-        metadata = CompanyMetadata()
         company_data = metadata.get_company_metadata(company_id)
         if not company_data:
             return {"success": False, "error": "Company not found"}
 
-        ingestor = DataIngestor()
         qdrant_result = ingestor.ingest_data(company_id, request.data)
 
-        data_store = CompanyDataStore()
         mongo_result = data_store.store_data(company_id, request.data)
 
         return {
@@ -270,6 +570,10 @@ async def ingest_company_data(company_id: str, request: IngestDataRequest):
             "company_id": company_id,
             "qdrant": {
                 "items_ingested": qdrant_result.get("items_ingested", 0),
+                "items_updated": qdrant_result.get("items_updated", 0),
+                "items_unchanged": qdrant_result.get("items_unchanged", 0),
+                "exact_duplicates": qdrant_result.get("exact_duplicates", 0),
+                "near_duplicates": qdrant_result.get("near_duplicates", 0),
                 "collection_name": qdrant_result.get("collection_name", ""),
             },
             "mongodb": {
@@ -280,12 +584,86 @@ async def ingest_company_data(company_id: str, request: IngestDataRequest):
         return {"success": False, "error": str(e)}
 
 
+def search_result(result) -> dict:
+    return {
+        "point_id": str(result.id),
+        "score": result.score,
+        # Dense cosine to the query; federated results are ordered by it
+        "similarity": result.payload.get("similarity"),
+        "source": result.payload.get("source", "unknown"),
+        "sprint": result.payload.get("sprint", 0),
+        "bug_stage": result.payload.get("bug_stage", ""),
+        "content": result.payload.get("content", ""),
+    }
+
+
+@app.post("/api/companies/{company_id}/search")
+async def search_company_data(
+    company_id: str,
+    request: SearchRequest,
+    resources: Resources = Depends(get_resources),
+):
+    try:
+        retriever = build_retriever(resources)
+        results = await retriever.hydrate(
+            company_id,
+            await retriever.search(
+                company_id,
+                request.query,
+                request.limit,
+                request.search_filters(),
+                request.diversity,
+            ),
+        )
+
+        return {
+            "success": True,
+            "company_id": company_id,
+            "results": [search_result(result) for result in results],
+            "count": len(results),
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.post("/api/search")
+async def search_all_companies(
+    request: FederatedSearchRequest,
+    resources: Resources = Depends(get_resources),
+):
+    """Search every company, or ``companies``, at once; each result names
+    the company it came from."""
+    try:
+        federated = await build_retriever(resources).search_companies(
+            request.query,
+            request.companies,
+            request.limit,
+            request.search_filters(),
+            request.diversity,
+        )
+
+        return {
+            "success": True,
+            "results": [
+                {"company_id": company_id, **search_result(result)}
+                for company_id, result in federated["results"]
+            ],
+            "count": len(federated["results"]),
+            "companies_searched": len(federated["companies"]),
+            "errors": federated["errors"],
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
 @app.get("/api/companies/{company_id}/data")
-async def get_company_data(
-    company_id: str, source: str = Query(None), limit: int = Query(100)
+def get_company_data(
+    company_id: str,
+    source: str = Query(None),
+    limit: int = Query(100),
+    data_store: CompanyDataStore = Depends(get_company_data_store),
 ):
     try:
-        data_store = CompanyDataStore()
         data = data_store.get_company_data(company_id, source, limit)
         return {"success": True, "company_id": company_id, "data": data, "count": len(data)}
     except Exception as e:
@@ -293,9 +671,10 @@ async def get_company_data(
 
 
 @app.get("/api/companies/{company_id}/stats")
-async def get_company_stats(company_id: str):
+def get_company_stats(
+    company_id: str, data_store: CompanyDataStore = Depends(get_company_data_store)
+):
     try:
-        data_store = CompanyDataStore()
         stats = data_store.get_data_stats(company_id)
         return {"success": True, "stats": stats}
     except Exception as e:
@@ -304,16 +683,18 @@ async def get_company_stats(company_id: str):
 
 @app.get("/api/users/{user_id}/chat-history")
 async def get_user_chat_history(
-    user_id: str, company_id: str = Query(None), limit: int = Query(50)
+    user_id: str,
+    company_id: str = Query(None),
+    limit: int = Query(50),
+    user_manager: AsyncUserManager = Depends(get_async_user_manager),
+    chat_history: AsyncChatHistory = Depends(get_async_chat_history),
 ):
     try:
-        user_manager = UserManager()
-        user = user_manager.get_user(user_id)
+        user = await user_manager.get_user(user_id)
         if not user:
             return {"success": False, "error": "User not found"}
 
-        chat_history = ChatHistory()
-        sessions = chat_history.get_user_sessions(user_id, company_id, limit)
+        sessions = await chat_history.get_user_sessions(user_id, company_id, limit)
         return {
             "success": True,
             "user_id": user_id,
@@ -325,10 +706,11 @@ async def get_user_chat_history(
 
 
 @app.get("/api/sessions/{session_id}")
-async def get_session(session_id: str):
+async def get_session(
+    session_id: str, chat_history: AsyncChatHistory = Depends(get_async_chat_history)
+):
     try:
-        chat_history = ChatHistory()
-        session = chat_history.get_session(session_id)
+        session = await chat_history.get_session(session_id)
         if not session:
             return {"success": False, "error": "Session not found"}
         return {"success": True, "session": session}
@@ -337,12 +719,36 @@ async def get_session(session_id: str):
 
 
 @app.get("/api/sessions/{session_id}/messages")
-async def get_session_messages(session_id: str):
+async def get_session_messages(
+    session_id: str,
+    after: Optional[int] = Query(None),
+    limit: int = Query(100, ge=1, le=500),
+    chat_history: AsyncChatHistory = Depends(get_async_chat_history),
+):
+    """Messages in order, a page at a time: pass the returned
+    ``next_cursor`` as ``after`` to read on; it is null on the last page."""
     try:
-        chat_history = ChatHistory()
-        messages = chat_history.get_session_messages(session_id)
-        if not messages:
-            return {"success": False, "error": "Session not found or no messages"}
-        return {"success": True, "session_id": session_id, "messages": messages}
+        page = await chat_history.get_session_messages(session_id, after, limit)
+        if page is None:
+            return {"success": False, "error": "Session not found"}
+        return {"success": True, "session_id": session_id, **page}
     except Exception as e:
         return {"success": False, "error": str(e)}
+
+
+@app.get("/api/cache/stats")
+async def get_cache_stats(resources: Resources = Depends(get_resources)):
+    try:
+        legacy = await build_retriever(resources).legacy_companies()
+    except Exception:
+        legacy = None
+    return {
+        "success": True,
+        "search_cache": resources.search_cache.stats(),
+        "answer_cache": resources.answer_cache.stats(),
+        "local_indexes": resources.local_indexes.stats(),
+        "history_writer": resources.history_writer.stats(),
+        # Companies limited to dense search until re-ingested with
+        # db_init --upgrade-legacy; None when Qdrant could not be reached
+        "legacy_collections": legacy,
+    }
@@ -0,0 +1,78 @@
+import pytest
+
+from utils.company_metadata import MESSAGE_BUCKET_SIZE, BaseChatHistory
+
+history = BaseChatHistory()
+
+
+def stored(seqs):
+    """Messages for ``seqs``, grouped into buckets as add_message stores them."""
+    buckets = {}
+    for seq in seqs:
+        buckets.setdefault(seq // MESSAGE_BUCKET_SIZE, []).append(
+            {"role": "user", "content": f"m{seq}", "seq": seq}
+        )
+    return buckets
+
+
+def read_page(buckets, after, limit, total):
+    """``get_session_messages`` over in-memory buckets."""
+    query = history.bucket_query("s", after, limit)
+    assert query["session_id"] == "s"
+    first, last = query["bucket"]["$gte"], query["bucket"]["$lte"]
+    messages = [
+        m for bucket, ms in buckets.items() if first <= bucket <= last for m in ms
+    ]
+    return history.page(messages, after, limit, total)
+
+
+def test_bucket_query_from_start():
+    query = history.bucket_query("s", None, 100)
+    assert query["bucket"] == {"$gte": 0, "$lte": 0}
+
+
+@pytest.mark.parametrize(
+    "after, buckets",
+    [
+        (98, (0, 1)),  # seq 99 is still in bucket 0
+        (99, (1, 1)),  # the page starts exactly at bucket 1
+        (100, (1, 2)),
+    ],
+)
+def test_bucket_query_on_bucket_boundary(after, buckets):
+    query = history.bucket_query("s", after, 100)
+    assert (query["bucket"]["$gte"], query["bucket"]["$lte"]) == buckets
+
+
+@pytest.mark.parametrize("after", [None, 0, 98, 99, 100, 199])
+@pytest.mark.parametrize("limit", [1, 100, 101])
+def test_pages_are_contiguous(after, limit):
+    total = 250
+    page = read_page(stored(range(total)), after, limit, total)
+
+    start = 0 if after is None else after + 1
+    expected = list(range(start, min(start + limit, total)))
+    assert [m["seq"] for m in page["messages"]] == expected
+    assert page["total"] == total
+    if expected[-1] < total - 1:
+        assert page["next_cursor"] == expected[-1]
+    else:
+        assert page["next_cursor"] is None
+
+
+def test_page_walks_over_seq_gap():
+    # seq 2 was reserved for a reply that was never written
+    buckets = stored([0, 1, 3])
+
+    first = read_page(buckets, None, 2, 4)
+    assert [m["seq"] for m in first["messages"]] == [0, 1]
+    assert first["next_cursor"] == 1
+
+    second = read_page(buckets, first["next_cursor"], 2, 4)
+    assert [m["seq"] for m in second["messages"]] == [3]
+    assert second["next_cursor"] is None
+
+
+def test_page_past_the_end():
+    page = read_page(stored(range(5)), 4, 100, 5)
+    assert page == {"messages": [], "next_cursor": None, "total": 5}
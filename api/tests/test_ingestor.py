@@ -0,0 +1,262 @@
+import hashlib
+import json
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from utils.chunker import Chunker
+from utils.embedding_cache import EmbeddingCache
+from utils.ingestor import DataIngestor
+from utils.items import item_point_id
+from utils.sparse import is_hybrid
+
+
+class HashEmbedder:
+    """Deterministic 768-d vectors, counting the texts it is asked to embed."""
+
+    def __init__(self):
+        self.texts = 0
+
+    def embed(self, model, input):
+        texts = [input] if isinstance(input, str) else list(input)
+        self.texts += len(texts)
+        return {"embeddings": [self.vector(text) for text in texts]}
+
+    @staticmethod
+    def vector(text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [digest[i % len(digest)] / 255.0 + 0.01 for i in range(768)]
+
+
+class MemoryManifest:
+    """IngestManifest kept in a dict, for one company."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def ensure_indexes(self):
+        pass
+
+    def get_hashes(self, company_id, point_ids):
+        return {
+            p: {k: v for k, v in self.entries[p].items() if k != "scope"}
+            for p in point_ids
+            if p in self.entries
+        }
+
+    def record(self, company_id, scope, entries):
+        for point_id, hashes in entries.items():
+            self.entries.setdefault(point_id, {}).update(hashes, scope=scope)
+
+    def point_ids(self, company_id, scope=None):
+        return {
+            p for p, e in self.entries.items() if scope is None or e["scope"] == scope
+        }
+
+    def remove(self, company_id, point_ids):
+        for point_id in point_ids:
+            self.entries.pop(point_id, None)
+
+    def clear(self, company_id):
+        self.entries.clear()
+
+
+class MemoryDataStore:
+    """CompanyDataStore's item methods kept in a dict, for one company."""
+
+    def __init__(self):
+        self.items = {}
+
+    def ensure_indexes(self):
+        pass
+
+    def upsert_items(self, company_id, documents, default_source="custom"):
+        self.items.update(documents)
+
+    def get_items(self, company_id, item_ids, fields=None):
+        return {i: self.items[i] for i in item_ids if i in self.items}
+
+    def remove_items(self, company_id, item_ids):
+        for item_id in item_ids:
+            self.items.pop(item_id, None)
+
+
+@pytest.fixture(params=[False, True], ids=["full", "slim"])
+def ingestor(request, tmp_path):
+    client = QdrantClient(":memory:")
+    ingestor = DataIngestor(
+        client,
+        HashEmbedder(),
+        embedding_cache=EmbeddingCache(str(tmp_path / "embeddings.sqlite3")),
+        manifest=MemoryManifest(),
+        slim_payloads=request.param,
+        data_store=MemoryDataStore(),
+        chunker=Chunker(max_tokens=8, overlap=2),
+    )
+    yield ingestor
+    ingestor.embedding_cache.close()
+    client.close()
+
+
+def test_metadata_edit_updates_payload_without_reembedding(ingestor):
+    item = {
+        "id": "JIRA-1",
+        "source": "jira_tickets",
+        "title": "Cache stampede",
+        "description": "Connection pool exhausted after cache expiry",
+        "sprint": 3,
+    }
+    first = ingestor.ingest_data("acme", [item])
+    assert first["items_ingested"] == 1
+    embedded = ingestor.embedder.texts
+
+    second = ingestor.ingest_data("acme", [{**item, "sprint": 4}])
+    assert second["items_ingested"] == 0
+    assert second["items_updated"] == 1
+    assert ingestor.embedder.texts == embedded
+
+    point_id = item_point_id("acme", item)
+    points, _ = ingestor.client.scroll("company_acme", with_payload=True)
+    assert len(points) > 1
+    assert {p.payload["sprint"] for p in points} == {4}
+    (point,) = ingestor.client.retrieve("company_acme", ids=[point_id])
+    if ingestor.slim_payloads:
+        stored = ingestor.data_store.get_items("acme", [point_id])[point_id]
+        assert stored["data"]["sprint"] == 4
+    else:
+        assert point.payload["full_data"]["sprint"] == 4
+
+    third = ingestor.ingest_data("acme", [{**item, "sprint": 4}])
+    assert third["items_unchanged"] == 1
+    assert third["items_updated"] == 0
+
+
+def test_content_edit_reembeds(ingestor):
+    item = {"id": "JIRA-2", "title": "Slow report", "description": "Missing index"}
+    ingestor.ingest_data("acme", [item])
+
+    edited = ingestor.ingest_data(
+        "acme", [{**item, "description": "Missing composite index"}]
+    )
+    assert edited["items_ingested"] == 1
+    assert edited["items_updated"] == 0
+
+
+def test_explicit_ids_are_scoped_by_source(ingestor):
+    ticket = {"id": 1, "source": "jira_tickets", "title": "Login fails on Safari"}
+    thread = {"id": 1, "source": "slack_conversations", "title": "Deploy freeze"}
+
+    result = ingestor.ingest_data("acme", [ticket, thread])
+
+    assert result["items_ingested"] == 2
+    assert result["exact_duplicates"] == 0
+
+
+def legacy_collection(ingestor, tmp_path, items):
+    ingestor.client.create_collection(
+        "company_acme", vectors_config=VectorParams(size=768, distance=Distance.COSINE)
+    )
+    directory = tmp_path / "acme"
+    directory.mkdir()
+    (directory / "jira.json").write_text(json.dumps(items))
+    return str(directory)
+
+
+def test_upgrade_legacy_recreates_hybrid_collection(ingestor, tmp_path):
+    item = {"id": "JIRA-3", "title": "Flaky deploy", "description": "Race in migration"}
+    directory = legacy_collection(ingestor, tmp_path, [item])
+    ingestor.upgrade_legacy = True
+
+    result = ingestor.ingest_company("acme", directory)
+
+    assert result["items_ingested"] == 1
+    assert is_hybrid(ingestor.client.get_collection("company_acme"))
+    assert ingestor.collection_layouts["company_acme"]["hybrid"]
+
+
+def test_upgrade_legacy_keeps_collection_with_unrecorded_points(ingestor, tmp_path):
+    on_disk = {"id": "JIRA-5", "title": "Cron drift", "description": "Clock skew"}
+    posted = {"title": "Runbook", "content": "Rotate the signing keys"}
+    directory = legacy_collection(ingestor, tmp_path, [on_disk])
+    legacy_points(ingestor, [(on_disk, "unknown"), (posted, "custom")])
+    ingestor.upgrade_legacy = True
+
+    # Legacy points have no manifest entries yet, then the posted item has
+    # none for this directory
+    for _ in range(2):
+        ingestor.ingest_company("acme", directory)
+        assert not is_hybrid(ingestor.client.get_collection("company_acme"))
+    assert item_of(ingestor, item_point_id("acme", posted)) == posted
+
+
+def legacy_points(ingestor, items):
+    """Points as written before ids were derived from item content."""
+    ingestor.client.upsert(
+        "company_acme",
+        [
+            PointStruct(
+                id=index,
+                vector=HashEmbedder.vector(ingestor.extract_content(item)),
+                payload={
+                    "company_id": "acme",
+                    "source": item.get("source", default_source),
+                    "content": ingestor.extract_content(item)[:1000],
+                    "full_data": item,
+                },
+            )
+            for index, (item, default_source) in enumerate(items)
+        ],
+    )
+
+
+def item_of(ingestor, point_id):
+    if ingestor.slim_payloads:
+        return ingestor.data_store.get_items("acme", [point_id])[point_id]["data"]
+    (point,) = ingestor.client.retrieve("company_acme", ids=[point_id])
+    return point.payload["full_data"]
+
+
+def test_directory_ingest_moves_legacy_points(ingestor, tmp_path):
+    on_disk = {"id": "JIRA-4", "title": "Queue backlog", "description": "Slow consumer"}
+    posted = {"title": "Runbook", "content": "Restart the worker pool"}
+    directory = legacy_collection(ingestor, tmp_path, [on_disk])
+    legacy_points(ingestor, [(on_disk, "unknown"), (posted, "custom")])
+
+    ingestor.ingest_company("acme", directory)
+
+    points, _ = ingestor.client.scroll("company_acme", limit=100)
+    assert not [p.id for p in points if isinstance(p.id, int)]
+    assert item_of(ingestor, item_point_id("acme", on_disk)) == on_disk
+    assert item_of(ingestor, item_point_id("acme", posted)) == posted
+    (moved,) = ingestor.client.retrieve(
+        "company_acme", ids=[item_point_id("acme", posted)]
+    )
+    assert moved.payload["source"] == "custom"
+
+
+def test_api_ingest_keeps_legacy_points(ingestor, tmp_path):
+    legacy_collection(ingestor, tmp_path, [])
+    legacy_points(
+        ingestor,
+        [({"title": f"Note {i}", "content": f"Legacy {i}"}, "custom") for i in range(3)],
+    )
+
+    ingestor.ingest_data("acme", [{"title": "New", "content": "Fresh item"}])
+
+    points, _ = ingestor.client.scroll("company_acme", limit=100)
+    assert sorted(p.id for p in points if isinstance(p.id, int)) == [0, 1, 2]
+
+
+def test_upgrade_legacy_after_moving_directory_points(ingestor, tmp_path):
+    on_disk = {"id": "JIRA-6", "title": "Cold start", "description": "Lazy imports"}
+    directory = legacy_collection(ingestor, tmp_path, [on_disk])
+    legacy_points(ingestor, [(on_disk, "unknown")])
+    ingestor.upgrade_legacy = True
+
+    ingestor.ingest_company("acme", directory)
+    assert not is_hybrid(ingestor.client.get_collection("company_acme"))
+
+    ingestor.ingest_company("acme", directory)
+    assert is_hybrid(ingestor.client.get_collection("company_acme"))
+    assert item_of(ingestor, item_point_id("acme", on_disk)) == on_disk
@@ -0,0 +1,130 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from itertools import count
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+class SemanticAnswerCache:
+    """Reuses generated answers across paraphrased tasks within a company.
+
+    An entry matches when the new task retrieved exactly the same points and
+    its embedding is at least ``threshold`` cosine-similar to the cached
+    task. Entries expire after ``ttl`` seconds and the least recently used
+    are dropped beyond ``max_entries``.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ):
+        self.threshold = (
+            threshold
+            if threshold is not None
+            else float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+        )
+        self.max_entries = (
+            max_entries
+            if max_entries is not None
+            else int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))
+        )
+        self.ttl = ttl if ttl is not None else float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+
+        self.entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self.buckets: Dict[tuple, List[int]] = {}
+        self.ids = count()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def bucket_key(company_id: str, point_ids: Iterable) -> tuple:
+        return (company_id, frozenset(str(point_id) for point_id in point_ids))
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> List[float]:
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def lookup(
+        self, company_id: str, embedding: Sequence[float], point_ids: Iterable
+    ) -> Optional[str]:
+        key = self.bucket_key(company_id, point_ids)
+        query = self._normalize(embedding)
+        now = time.monotonic()
+
+        with self.lock:
+            best_id, best_score = None, self.threshold
+            for entry_id in list(self.buckets.get(key, [])):
+                entry = self.entries[entry_id]
+                if entry["expires_at"] < now:
+                    self._remove(entry_id)
+                    continue
+
+                score = sum(a * b for a, b in zip(query, entry["embedding"]))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(best_id)
+            self.hits += 1
+            return self.entries[best_id]["answer"]
+
+    def store(
+        self,
+        company_id: str,
+        embedding: Sequence[float],
+        point_ids: Iterable,
+        answer: str,
+    ):
+        key = self.bucket_key(company_id, point_ids)
+
+        with self.lock:
+            entry_id = next(self.ids)
+            self.entries[entry_id] = {
+                "key": key,
+                "embedding": self._normalize(embedding),
+                "answer": answer,
+                "expires_at": time.monotonic() + self.ttl,
+            }
+            self.buckets.setdefault(key, []).append(entry_id)
+
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+
+    def invalidate_company(self, company_id: str) -> int:
+        with self.lock:
+            stale = [
+                entry_id
+                for entry_id, entry in self.entries.items()
+                if entry["key"][0] == company_id
+            ]
+            for entry_id in stale:
+                self._remove(entry_id)
+            return len(stale)
+
+    def _remove(self, entry_id: int):
+        entry = self.entries.pop(entry_id)
+        bucket = self.buckets[entry["key"]]
+        bucket.remove(entry_id)
+        if not bucket:
+            del self.buckets[entry["key"]]
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
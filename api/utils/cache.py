@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        with self.lock:
+            stale = [key for key in self.entries if predicate(key)]
+            for key in stale:
+                del self.entries[key]
+            return len(stale)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SearchCache:
+    """Query embedding and top-k result caches shared by the retrievers.
+
+    Result keys start with the company id so an ingest into one company
+    only drops that company's entries.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        if max_entries is None:
+            max_entries = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1024"))
+        if ttl is None:
+            ttl = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+        self.embeddings = TTLCache(max_entries, ttl)
+        self.results = TTLCache(max_entries, ttl)
+        # company id -> whether its collection supports hybrid search
+        self.collections = TTLCache(max_entries, ttl)
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def result_key(
+        self,
+        company_id: str,
+        query: str,
+        limit: int,
+        filters=None,
+        diversity: float = 0.0,
+    ) -> tuple:
+        # ``filters`` is a retriever SearchFilters; its key() is hashable
+        return (
+            company_id,
+            self.normalize(query),
+            limit,
+            filters.key() if filters is not None else None,
+            diversity,
+        )
+
+    def invalidate_company(self, company_id: str) -> int:
+        self.collections.invalidate(lambda key: key == company_id)
+        return self.results.invalidate(lambda key: key[0] == company_id)
+
+    def stats(self) -> Dict:
+        return {
+            "embeddings": self.embeddings.stats(),
+            "results": self.results.stats(),
+        }
@@ -0,0 +1,59 @@
+import os
+import re
+from typing import List, Optional
+
+# Words and individual punctuation marks; close enough to the embedding and
+# chat models' tokenizers to size text without loading either.
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    return sum(1 for _ in _TOKEN.finditer(text))
+
+
+class Chunker:
+    """Splits long item content into overlapping token windows.
+
+    Each window holds at most ``max_tokens`` tokens and repeats the last
+    ``overlap`` tokens of the previous one, so a passage cut at a boundary
+    still appears whole in one chunk. Content that fits in one window is
+    returned unchanged; ``max_tokens`` 0 disables chunking.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, overlap: Optional[int] = None):
+        self.max_tokens = (
+            max_tokens
+            if max_tokens is not None
+            else int(os.getenv("CHUNK_MAX_TOKENS", "256"))
+        )
+        self.overlap = (
+            overlap if overlap is not None else int(os.getenv("CHUNK_OVERLAP", "32"))
+        )
+        if self.max_tokens and not 0 <= self.overlap < self.max_tokens:
+            raise ValueError("CHUNK_OVERLAP must be smaller than CHUNK_MAX_TOKENS")
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_tokens > 0
+
+    @property
+    def signature(self) -> str:
+        """Identifies the settings, so a change re-chunks existing items."""
+        return f"chunks:{self.max_tokens}:{self.overlap}" if self.enabled else ""
+
+    def split(self, text: str) -> List[str]:
+        if not self.enabled:
+            return [text]
+
+        spans = [match.span() for match in _TOKEN.finditer(text)]
+        if len(spans) <= self.max_tokens:
+            return [text]
+
+        chunks = []
+        step = self.max_tokens - self.overlap
+        for start in range(0, len(spans), step):
+            window = spans[start : start + self.max_tokens]
+            chunks.append(text[window[0][0] : window[-1][1]])
+            if start + self.max_tokens >= len(spans):
+                break
+        return chunks
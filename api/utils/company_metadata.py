@@ -2,16 +2,19 @@ import os
 import uuid
 from datetime import datetime
 from typing import Optional, List, Dict
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient, MongoClient, ReturnDocument, UpdateOne
 from dotenv import load_dotenv
 
+from .items import item_point_id
+
 load_dotenv()
 
 
 class UserManager:
-    def __init__(self):
-        mongo_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
-        self.client = MongoClient(mongo_uri)
+    def __init__(self, client: Optional[MongoClient] = None):
+        self.client = client or MongoClient(
+            os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
+        )
         self.db = self.client["donna"]
         self.collection = self.db["users"]
 
@@ -50,10 +53,24 @@ class UserManager:
         return user
 
 
+class AsyncUserManager:
+    def __init__(self, client: Optional[AsyncMongoClient] = None):
+        self.client = client or AsyncMongoClient(
+            os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
+        )
+        self.db = self.client["donna"]
+        self.collection = self.db["users"]
+
+    async def get_user(self, user_id: str) -> Optional[Dict]:
+        user = await self.collection.find_one({"user_id": user_id}, {"_id": 0})
+        return user
+
+
 class CompanyMetadata:
-    def __init__(self):
-        mongo_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
-        self.client = MongoClient(mongo_uri)
+    def __init__(self, client: Optional[MongoClient] = None):
+        self.client = client or MongoClient(
+            os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
+        )
         self.db = self.client["donna"]
         self.collection = self.db["company_metadata"]
 
@@ -233,28 +250,39 @@ This incident illustrated that retry logic is not a universal solution—it must
         print(f"Seeded {len(companies_data)} demo companies")
 
 
-class ChatHistory:
-    def __init__(self):
-        mongo_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
-        self.client = MongoClient(mongo_uri)
-        self.db = self.client["donna"]
-        self.collection = self.db["chat_history"]
+# Messages per document in the chat_messages collection
+MESSAGE_BUCKET_SIZE = 100
 
-    def create_session(self, user_id: str, company_id: str) -> str:
-        session_id = str(uuid.uuid4())
-        session = {
-            "session_id": session_id,
+
+class BaseChatHistory:
+    """Sessions live in ``chat_history`` with summary fields only; their
+    messages are stored in ``chat_messages`` in buckets of
+    ``MESSAGE_BUCKET_SIZE``, keyed by session and bucket number, and each
+    message carries its sequence number ``seq``.
+
+    Sessions written before bucketing still embed a ``messages`` array. They
+    are read from it as is and moved into buckets on their next write.
+    """
+
+    bucket_size = MESSAGE_BUCKET_SIZE
+
+    def new_session(self, user_id: str, company_id: str) -> Dict:
+        return {
+            "session_id": str(uuid.uuid4()),
             "user_id": user_id,
             "company_id": company_id,
-            "messages": [],
+            "message_count": 0,
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow(),
         }
-        self.collection.insert_one(session)
-        return session_id
 
-    def add_message(
-        self, session_id: str, role: str, content: str, context_used: List[Dict] = None
+    def new_message(
+        self,
+        role: str,
+        content: str,
+        context_used: List[Dict] = None,
+        metadata: Optional[Dict] = None,
+        seq: Optional[int] = None,
     ) -> Dict:
         message = {
             "role": role,
@@ -264,80 +292,525 @@ class ChatHistory:
 
         if context_used:
             message["context_used"] = context_used
+        if metadata:
+            message["metadata"] = metadata
+        if seq is not None:
+            message["seq"] = seq
 
-        result = self.collection.update_one(
-            {"session_id": session_id},
+        return message
+
+    @staticmethod
+    def message_summary(message: Dict) -> Dict:
+        return {
+            "role": message["role"],
+            "content": message["content"][:200],
+            "timestamp": message["timestamp"],
+            "seq": message.get("seq"),
+        }
+
+    @staticmethod
+    def reserve_update(count: int = 1) -> Dict:
+        """Session update claiming the next ``count`` sequence numbers."""
+        return {"$inc": {"message_count": count}}
+
+    def summary_update(self, session_id: str, message: Dict) -> tuple:
+        """Filter and update recording ``message`` as the session's last one
+        unless a later one already is; a reply whose number was reserved up
+        front may be written after the messages that follow it."""
+        return (
             {
-                "$push": {"messages": message},
-                "$set": {"updated_at": datetime.utcnow()},
+                "session_id": session_id,
+                "last_message.seq": {"$not": {"$gt": message["seq"]}},
+            },
+            {
+                "$set": {"last_message": self.message_summary(message)},
+                "$max": {"updated_at": message["timestamp"]},
             },
         )
 
-        if result.modified_count > 0:
-            return {"success": True, "session_id": session_id}
-        return {"success": False, "error": "Session not found"}
+    def reserved_seq(self, session: Dict, count: int) -> int:
+        """First of the ``count`` numbers just reserved on ``session``; a
+        legacy session's embedded messages come before them."""
+        return session["message_count"] - count + len(session.get("messages", []))
 
-    def get_session(self, session_id: str) -> Optional[Dict]:
-        session = self.collection.find_one({"session_id": session_id}, {"_id": 0})
-        return session
+    def bucket_update(self, session_id: str, message: Dict) -> tuple:
+        return (
+            {"session_id": session_id, "bucket": message["seq"] // self.bucket_size},
+            {"$push": {"messages": message}},
+        )
 
-    def get_user_sessions(
-        self, user_id: str, company_id: Optional[str] = None, limit: int = 50
-    ) -> List[Dict]:
+    def legacy_move_update(self, messages: List[Dict]) -> Dict:
+        """Session update dropping a legacy session's embedded messages in
+        favour of the summary fields."""
+        update = {"$unset": {"messages": ""}, "$inc": {"message_count": len(messages)}}
+        first_user = next((m for m in messages if m["role"] == "user"), None)
+        if first_user:
+            update["$set"] = {"title": first_user["content"][:200]}
+        return update
+
+    def legacy_bucket_updates(
+        self, session_id: str, messages: List[Dict]
+    ) -> List[UpdateOne]:
+        """Upserts copying a legacy session's embedded messages into buckets;
+        a bucket may already hold a message written since the move began."""
+        buckets: Dict[int, List[Dict]] = {}
+        for seq, message in enumerate(messages):
+            message = {**message, "seq": seq}
+            buckets.setdefault(seq // self.bucket_size, []).append(message)
+        return [
+            UpdateOne(
+                {"session_id": session_id, "bucket": bucket},
+                {"$push": {"messages": {"$each": bucket_messages}}},
+                upsert=True,
+            )
+            for bucket, bucket_messages in buckets.items()
+        ]
+
+    @staticmethod
+    def summary_pipeline(query: Dict, limit: int) -> List[Dict]:
+        """Aggregation returning matching sessions, latest first, with their
+        summary fields and without any embedded ``messages``; a legacy
+        session's summary is computed from its array on the server."""
+        legacy = {"$isArray": "$messages"}
+        last = {"$arrayElemAt": ["$messages", -1]}
+        first_user = {
+            "$arrayElemAt": [
+                {
+                    "$filter": {
+                        "input": "$messages",
+                        "cond": {"$eq": ["$$this.role", "user"]},
+                    }
+                },
+                0,
+            ]
+        }
+        return [
+            {"$match": query},
+            {"$sort": {"updated_at": -1}},
+            {"$limit": limit},
+            {
+                "$addFields": {
+                    "message_count": {
+                        "$cond": [legacy, {"$size": "$messages"}, "$message_count"]
+                    },
+                    "last_message": {
+                        "$cond": [
+                            legacy,
+                            {
+                                "$let": {
+                                    "vars": {"m": last},
+                                    "in": {
+                                        "$cond": [
+                                            "$$m",
+                                            {
+                                                "role": "$$m.role",
+                                                "content": {
+                                                    "$substrCP": ["$$m.content", 0, 200]
+                                                },
+                                                "timestamp": "$$m.timestamp",
+                                            },
+                                            "$$REMOVE",
+                                        ]
+                                    },
+                                }
+                            },
+                            "$last_message",
+                        ]
+                    },
+                    "title": {
+                        "$ifNull": [
+                            "$title",
+                            {
+                                "$let": {
+                                    "vars": {"m": first_user},
+                                    "in": {
+                                        "$cond": [
+                                            "$$m",
+                                            {"$substrCP": ["$$m.content", 0, 200]},
+                                            "$$REMOVE",
+                                        ]
+                                    },
+                                }
+                            },
+                        ]
+                    },
+                }
+            },
+            {"$project": {"_id": 0, "messages": 0}},
+        ]
+
+    def page(
+        self, messages: List[Dict], after: Optional[int], limit: int, total: int
+    ) -> Dict:
+        """Up to ``limit`` messages with ``seq`` above ``after``, in order,
+        and the cursor for the next page (``None`` on the last one)."""
+        start = -1 if after is None else after
+        messages = sorted(
+            (m for m in messages if m["seq"] > start), key=lambda m: m["seq"]
+        )[:limit]
+        next_cursor = None
+        if messages and messages[-1]["seq"] < total - 1:
+            next_cursor = messages[-1]["seq"]
+        return {"messages": messages, "next_cursor": next_cursor, "total": total}
+
+    def bucket_query(self, session_id: str, after: Optional[int], limit: int):
+        first = 0 if after is None else (after + 1) // self.bucket_size
+        last = ((-1 if after is None else after) + limit) // self.bucket_size
+        return {"session_id": session_id, "bucket": {"$gte": first, "$lte": last}}
+
+    def user_sessions_query(self, user_id: str, company_id: Optional[str]) -> Dict:
         query = {"user_id": user_id}
         if company_id:
             query["company_id"] = company_id
+        return query
+
+
+class ChatHistory(BaseChatHistory):
+    def __init__(self, client: Optional[MongoClient] = None):
+        self.client = client or MongoClient(
+            os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
+        )
+        self.db = self.client["donna"]
+        self.collection = self.db["chat_history"]
+        self.messages = self.db["chat_messages"]
+
+    def ensure_indexes(self):
+        self.messages.create_index([("session_id", 1), ("bucket", 1)], unique=True)
+
+    def create_session(self, user_id: str, company_id: str) -> str:
+        session = self.new_session(user_id, company_id)
+        self.collection.insert_one(session)
+        return session["session_id"]
+
+    def add_message(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        context_used: List[Dict] = None,
+        metadata: Optional[Dict] = None,
+        reserve_reply: bool = False,
+    ) -> Dict:
+        """Append a message. With ``reserve_reply`` the number after it is
+        claimed too and returned as ``reply_seq``, so a reply written later
+        keeps its place before any message that follows."""
+        message = self.new_message(role, content, context_used, metadata)
+
+        count = 2 if reserve_reply else 1
+        session = self.collection.find_one_and_update(
+            {"session_id": session_id},
+            self.reserve_update(count),
+            projection={"_id": 0, "message_count": 1, "title": 1, "messages": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if session is None:
+            return {"success": False, "error": "Session not found"}
+
+        message["seq"] = self.reserved_seq(session, count)
+        if "messages" in session:
+            self._move_legacy_messages(session_id, session["messages"])
+
+        self.write_messages([(session_id, message)])
+        if role == "user" and "title" not in session:
+            self.collection.update_one(
+                {"session_id": session_id, "title": {"$exists": False}},
+                {"$set": {"title": content[:200]}},
+            )
+        result = {"success": True, "session_id": session_id, "seq": message["seq"]}
+        if reserve_reply:
+            result["reply_seq"] = message["seq"] + 1
+        return result
 
+    def write_messages(self, entries: List[tuple]):
+        """Store ``(session_id, message)`` pairs whose ``seq`` is already
+        reserved, with one bulk write per collection."""
+        if not entries:
+            return
+        self.messages.bulk_write(
+            [UpdateOne(*self.bucket_update(s, m), upsert=True) for s, m in entries],
+            ordered=False,
+        )
+        self.collection.bulk_write(
+            [UpdateOne(*self.summary_update(s, m)) for s, m in entries],
+            ordered=False,
+        )
+
+    def _move_legacy_messages(self, session_id: str, messages: List[Dict]):
+        # Only the writer that removes the array copies it, so concurrent
+        # first writes to a legacy session move it once
+        result = self.collection.update_one(
+            {"session_id": session_id, "messages": {"$exists": True}},
+            self.legacy_move_update(messages),
+        )
+        if result.modified_count and messages:
+            self.messages.bulk_write(self.legacy_bucket_updates(session_id, messages))
+
+    def get_session(self, session_id: str) -> Optional[Dict]:
         sessions = list(
-            self.collection.find(query, {"_id": 0})
-            .sort("updated_at", -1)
-            .limit(limit)
+            self.collection.aggregate(
+                self.summary_pipeline({"session_id": session_id}, 1)
+            )
         )
-        return sessions
+        return sessions[0] if sessions else None
 
-    def get_session_messages(self, session_id: str) -> List[Dict]:
+    def get_user_sessions(
+        self, user_id: str, company_id: Optional[str] = None, limit: int = 50
+    ) -> List[Dict]:
+        query = self.user_sessions_query(user_id, company_id)
+        return list(self.collection.aggregate(self.summary_pipeline(query, limit)))
+
+    def get_session_messages(
+        self, session_id: str, after: Optional[int] = None, limit: int = 100
+    ) -> Optional[Dict]:
+        """One page of a session's messages; ``None`` if there is no such
+        session."""
         session = self.collection.find_one(
-            {"session_id": session_id}, {"_id": 0, "messages": 1}
+            {"session_id": session_id}, {"_id": 0, "message_count": 1, "messages": 1}
         )
-        if session:
-            return session.get("messages", [])
-        return []
+        if session is None:
+            return None
+        if "messages" in session:
+            legacy = [{**m, "seq": i} for i, m in enumerate(session["messages"])]
+            return self.page(legacy, after, limit, len(legacy))
+
+        buckets = self.messages.find(
+            self.bucket_query(session_id, after, limit), {"_id": 0, "messages": 1}
+        )
+        messages = [m for bucket in buckets for m in bucket["messages"]]
+        return self.page(messages, after, limit, session.get("message_count", 0))
+
+
+class AsyncChatHistory(BaseChatHistory):
+    def __init__(self, client: Optional[AsyncMongoClient] = None):
+        self.client = client or AsyncMongoClient(
+            os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
+        )
+        self.db = self.client["donna"]
+        self.collection = self.db["chat_history"]
+        self.messages = self.db["chat_messages"]
+
+    async def ensure_indexes(self):
+        await self.messages.create_index(
+            [("session_id", 1), ("bucket", 1)], unique=True
+        )
+
+    async def create_session(self, user_id: str, company_id: str) -> str:
+        session = self.new_session(user_id, company_id)
+        await self.collection.insert_one(session)
+        return session["session_id"]
+
+    async def add_message(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        context_used: List[Dict] = None,
+        metadata: Optional[Dict] = None,
+        reserve_reply: bool = False,
+    ) -> Dict:
+        message = self.new_message(role, content, context_used, metadata)
+
+        count = 2 if reserve_reply else 1
+        session = await self.collection.find_one_and_update(
+            {"session_id": session_id},
+            self.reserve_update(count),
+            projection={"_id": 0, "message_count": 1, "title": 1, "messages": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if session is None:
+            return {"success": False, "error": "Session not found"}
+
+        message["seq"] = self.reserved_seq(session, count)
+        if "messages" in session:
+            await self._move_legacy_messages(session_id, session["messages"])
+
+        await self.write_messages([(session_id, message)])
+        if role == "user" and "title" not in session:
+            await self.collection.update_one(
+                {"session_id": session_id, "title": {"$exists": False}},
+                {"$set": {"title": content[:200]}},
+            )
+        result = {"success": True, "session_id": session_id, "seq": message["seq"]}
+        if reserve_reply:
+            result["reply_seq"] = message["seq"] + 1
+        return result
+
+    async def write_messages(self, entries: List[tuple]):
+        if not entries:
+            return
+        await self.messages.bulk_write(
+            [UpdateOne(*self.bucket_update(s, m), upsert=True) for s, m in entries],
+            ordered=False,
+        )
+        await self.collection.bulk_write(
+            [UpdateOne(*self.summary_update(s, m)) for s, m in entries],
+            ordered=False,
+        )
+
+    async def _move_legacy_messages(self, session_id: str, messages: List[Dict]):
+        result = await self.collection.update_one(
+            {"session_id": session_id, "messages": {"$exists": True}},
+            self.legacy_move_update(messages),
+        )
+        if result.modified_count and messages:
+            await self.messages.bulk_write(
+                self.legacy_bucket_updates(session_id, messages)
+            )
+
+    async def get_session(self, session_id: str) -> Optional[Dict]:
+        cursor = await self.collection.aggregate(
+            self.summary_pipeline({"session_id": session_id}, 1)
+        )
+        sessions = await cursor.to_list()
+        return sessions[0] if sessions else None
+
+    async def get_user_sessions(
+        self, user_id: str, company_id: Optional[str] = None, limit: int = 50
+    ) -> List[Dict]:
+        query = self.user_sessions_query(user_id, company_id)
+        cursor = await self.collection.aggregate(self.summary_pipeline(query, limit))
+        return await cursor.to_list()
+
+    async def get_session_messages(
+        self, session_id: str, after: Optional[int] = None, limit: int = 100
+    ) -> Optional[Dict]:
+        session = await self.collection.find_one(
+            {"session_id": session_id}, {"_id": 0, "message_count": 1, "messages": 1}
+        )
+        if session is None:
+            return None
+        if "messages" in session:
+            legacy = [{**m, "seq": i} for i, m in enumerate(session["messages"])]
+            return self.page(legacy, after, limit, len(legacy))
+
+        buckets = await self.messages.find(
+            self.bucket_query(session_id, after, limit), {"_id": 0, "messages": 1}
+        ).to_list()
+        messages = [m for bucket in buckets for m in bucket["messages"]]
+        return self.page(messages, after, limit, session.get("message_count", 0))
 
 
 class CompanyDataStore:
-    def __init__(self):
-        mongo_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
-        self.client = MongoClient(mongo_uri)
+    # One document per company and item; documents without an item_id,
+    # written before items were keyed, are reconciled before it is built
+    item_index = "company_id_item_id_unique"
+
+    def __init__(self, client: Optional[MongoClient] = None):
+        self.client = client or MongoClient(
+            os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
+        )
         self.db = self.client["donna"]
         self.collection = self.db["company_data"]
 
+    def ensure_indexes(self):
+        if self.item_index in self.collection.index_information():
+            return
+        self._reconcile_items()
+        # Replaces the earlier non-unique index on the same keys
+        if "company_id_1_item_id_1" in self.collection.index_information():
+            self.collection.drop_index("company_id_1_item_id_1")
+        self.collection.create_index(
+            [("company_id", 1), ("item_id", 1)],
+            name=self.item_index,
+            unique=True,
+            partialFilterExpression={"item_id": {"$exists": True}},
+        )
+
+    def _reconcile_items(self):
+        """Give documents written before items were keyed by point id their
+        ``item_id``, then keep only the newest document per item."""
+        operations = [
+            UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {"item_id": item_point_id(doc["company_id"], doc["data"])}},
+            )
+            for doc in self.collection.find(
+                {"item_id": {"$exists": False}, "data": {"$type": "object"}},
+                {"company_id": 1, "data": 1},
+            )
+        ]
+        for start in range(0, len(operations), 1000):
+            self.collection.bulk_write(operations[start : start + 1000], ordered=False)
+
+        duplicates = self.collection.aggregate(
+            [
+                {"$match": {"item_id": {"$exists": True}}},
+                {"$sort": {"ingested_at": -1}},
+                {
+                    "$group": {
+                        "_id": {"company_id": "$company_id", "item_id": "$item_id"},
+                        "ids": {"$push": "$_id"},
+                    }
+                },
+                {"$match": {"ids.1": {"$exists": True}}},
+            ]
+        )
+        stale = [doc_id for group in duplicates for doc_id in group["ids"][1:]]
+        for start in range(0, len(stale), 1000):
+            self.collection.delete_many({"_id": {"$in": stale[start : start + 1000]}})
+
     def store_data(self, company_id: str, data_items: List[Dict]) -> Dict:
         if not isinstance(data_items, list):
             data_items = [data_items]
 
-        documents = []
-        for item in data_items:
-            if not isinstance(item, dict):
-                continue
-
-            doc = {
-                "company_id": company_id,
-                "source": item.get("source", "custom"),
-                "data": item,
-                "ingested_at": datetime.utcnow(),
-            }
-            documents.append(doc)
+        documents = {
+            item_point_id(company_id, item): {"data": item}
+            for item in data_items
+            if isinstance(item, dict)
+        }
 
         if documents:
-            result = self.collection.insert_many(documents)
+            self.upsert_items(company_id, documents, default_source="custom")
             return {
                 "success": True,
-                "items_stored": len(result.inserted_ids),
-                "inserted_ids": [str(id) for id in result.inserted_ids],
+                "items_stored": len(documents),
+                "item_ids": list(documents),
             }
 
         return {"success": False, "error": "No valid documents to store"}
 
+    def upsert_items(
+        self, company_id: str, documents: Dict[str, Dict], default_source: str = "custom"
+    ):
+        """Write items keyed by their point id so repeated ingests overwrite
+        rather than duplicate. Each document holds the raw item under
+        ``data`` and, when known, its extracted ``content``."""
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"company_id": company_id, "item_id": item_id},
+                {
+                    "$set": {
+                        **doc,
+                        "source": doc["data"].get("source", default_source),
+                        "ingested_at": now,
+                    }
+                },
+                upsert=True,
+            )
+            for item_id, doc in documents.items()
+        ]
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+
+    def get_items(
+        self, company_id: str, item_ids: List[str], fields: Optional[List[str]] = None
+    ) -> Dict[str, Dict]:
+        """Fetch items by point id in one query, projecting ``fields`` only."""
+        projection = {"_id": 0, "item_id": 1}
+        for field in fields or ["data", "content", "chunks"]:
+            projection[field] = 1
+
+        cursor = self.collection.find(
+            {"company_id": company_id, "item_id": {"$in": list(item_ids)}}, projection
+        )
+        return {doc["item_id"]: doc for doc in cursor}
+
+    def remove_items(self, company_id: str, item_ids: List[str]):
+        self.collection.delete_many(
+            {"company_id": company_id, "item_id": {"$in": list(item_ids)}}
+        )
+
     def get_company_data(
         self, company_id: str, source: Optional[str] = None, limit: int = 100
     ) -> List[Dict]:
@@ -366,6 +839,98 @@ class CompanyDataStore:
         }
 
 
+class AsyncCompanyDataStore:
+    def __init__(self, client: Optional[AsyncMongoClient] = None):
+        self.client = client or AsyncMongoClient(
+            os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
+        )
+        self.db = self.client["donna"]
+        self.collection = self.db["company_data"]
+
+    async def get_items(
+        self, company_id: str, item_ids: List[str], fields: Optional[List[str]] = None
+    ) -> Dict[str, Dict]:
+        projection = {"_id": 0, "item_id": 1}
+        for field in fields or ["data", "content", "chunks"]:
+            projection[field] = 1
+
+        cursor = self.collection.find(
+            {"company_id": company_id, "item_id": {"$in": list(item_ids)}}, projection
+        )
+        return {doc["item_id"]: doc for doc in await cursor.to_list()}
+
+
+class IngestManifest:
+    """Records which points were ingested for a company, and from where.
+
+    ``scope`` names the ingest source (a data directory, or ``api`` for
+    items posted to the ingest endpoint) so a directory re-run only removes
+    points that directory previously produced.
+    """
+
+    def __init__(self, client: Optional[MongoClient] = None):
+        self.client = client or MongoClient(
+            os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
+        )
+        self.db = self.client["donna"]
+        self.collection = self.db["ingest_manifest"]
+
+    def ensure_indexes(self):
+        self.collection.create_index([("company_id", 1), ("point_id", 1)], unique=True)
+        self.collection.create_index([("company_id", 1), ("scope", 1)])
+
+    def get_hashes(
+        self, company_id: str, point_ids: List[str]
+    ) -> Dict[str, Dict[str, str]]:
+        """``content_hash`` and ``item_hash`` recorded for each point id;
+        entries written before item hashes were kept have no ``item_hash``."""
+        entries = self.collection.find(
+            {"company_id": company_id, "point_id": {"$in": point_ids}},
+            {"_id": 0, "point_id": 1, "content_hash": 1, "item_hash": 1},
+        )
+        return {e.pop("point_id"): e for e in entries}
+
+    def record(self, company_id: str, scope: str, entries: Dict[str, Dict[str, str]]):
+        if not entries:
+            return
+
+        now = datetime.utcnow()
+        self.collection.bulk_write(
+            [
+                UpdateOne(
+                    {"company_id": company_id, "point_id": point_id},
+                    {
+                        "$set": {
+                            **hashes,
+                            "scope": scope,
+                            "updated_at": now,
+                        }
+                    },
+                    upsert=True,
+                )
+                for point_id, hashes in entries.items()
+            ],
+            ordered=False,
+        )
+
+    def point_ids(self, company_id: str, scope: Optional[str] = None) -> set:
+        query = {"company_id": company_id}
+        if scope:
+            query["scope"] = scope
+        return {
+            e["point_id"] for e in self.collection.find(query, {"_id": 0, "point_id": 1})
+        }
+
+    def remove(self, company_id: str, point_ids: List[str]):
+        if point_ids:
+            self.collection.delete_many(
+                {"company_id": company_id, "point_id": {"$in": point_ids}}
+            )
+
+    def clear(self, company_id: str):
+        self.collection.delete_many({"company_id": company_id})
+
+
 if __name__ == "__main__":
     metadata = CompanyMetadata()
     metadata.seed_demo_companies()
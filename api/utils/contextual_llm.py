@@ -1,97 +1,169 @@
 from google import genai
-from .retriever import DataRetriever
-from typing import Dict, Optional
+from .chunker import count_tokens
+from .prompt_budget import INSIGHT_SECTIONS, PromptBudget
+from .retriever import AsyncDataRetriever, DataRetriever, SearchFilters
+from typing import Dict, List, Optional, Tuple
 import os
 
+PROMPT_INSTRUCTIONS = """
 
-class ContextualLLM:
-    def __init__(self, api_key: Optional[str] = None, model: str = "gemini-2.5-flash"):
-        self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
-        if not self.api_key:
-            raise ValueError(
-                "GOOGLE_API_KEY environment variable must be set or api_key must be provided"
-            )
-        self.client = genai.Client(api_key=self.api_key)
-        self.model_name = model
-        self.retriever = DataRetriever()
+Based on the above context, provide:
+1. What to be careful about
+2. Potential pitfalls to avoid
+3. Best practices from past experience
+4. Specific warnings if any patterns match
 
-    def get_company_context(self, company_id: str, task: str, limit: int = 10) -> Dict:
-        return self.retriever.get_context(company_id, task, limit)
+If nothing relevant is found in past context, say so and proceed with general guidance."""
 
-    def build_prompt(self, task: str, context: Dict) -> str:
-        formatted_context = context["formatted_context"]
-        warnings = context.get("warnings", [])
-        lessons = context.get("lessons_learned", [])
-        mistakes = context.get("common_mistakes", [])
-        bug_clues = context.get("bug_clues", [])
 
-        prompt = f"""You are a technical advisor helping developers avoid past mistakes.
+class BaseContextualLLM:
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "gemini-2.5-flash",
+        client: Optional[genai.Client] = None,
+        budget: Optional[PromptBudget] = None,
+    ):
+        if client is None:
+            api_key = api_key or os.getenv("GOOGLE_API_KEY")
+            if not api_key:
+                raise ValueError(
+                    "GOOGLE_API_KEY environment variable must be set or api_key must be provided"
+                )
+            client = genai.Client(api_key=api_key)
+        self.api_key = api_key
+        self.client = client
+        self.model_name = model
+        self.budget = budget or PromptBudget()
+
+    def build_prompt(self, task: str, context: Dict) -> str:
+        header = f"""You are a technical advisor helping developers avoid past mistakes.
 
 User's task: {task}
 
 Past team context:
-{formatted_context}
 """
+        sections = {
+            "context": [
+                self.retriever.format_results([result])
+                for result in context["raw_results"]
+            ]
+        }
+        for name, _ in INSIGHT_SECTIONS:
+            sections[name] = self.budget.dedupe(context.get(name, []))
+        chosen = self.budget.fill(
+            count_tokens(header + PROMPT_INSTRUCTIONS), sections
+        )
 
-        if warnings:
-            prompt += f"\n\nPast warnings:\n" + "\n".join(
-                [f"- {w}" for w in warnings[:5]]
-            )
-
-        if lessons:
-            prompt += f"\n\nLessons learned:\n" + "\n".join(
-                [f"- {l}" for l in lessons[:5]]
-            )
-
-        if mistakes:
-            prompt += f"\n\nCommon mistakes to avoid:\n" + "\n".join(
-                [f"- {m}" for m in mistakes[:5]]
-            )
-
-        if bug_clues:
-            prompt += f"\n\nBug-related insights:\n" + "\n".join(
-                [f"- {b}" for b in bug_clues[:5]]
-            )
-
-        prompt += """
-
-Based on the above context, provide:
-1. What to be careful about
-2. Potential pitfalls to avoid
-3. Best practices from past experience
-4. Specific warnings if any patterns match
+        prompt = header + "\n\n".join(chosen["context"]) + "\n"
+        for name, heading in INSIGHT_SECTIONS:
+            if chosen[name]:
+                prompt += f"\n\n{heading}:\n" + "\n".join(
+                    [f"- {entry}" for entry in chosen[name]]
+                )
 
-If nothing relevant is found in past context, say so and proceed with general guidance."""
+        return prompt + PROMPT_INSTRUCTIONS
 
-        return prompt
+    def relevant_context(self, context: Dict) -> Dict:
+        """``context`` rebuilt from only the results above the budget's
+        score cutoff."""
+        results = self.budget.relevant(context["raw_results"])
+        if len(results) == len(context["raw_results"]):
+            return context
 
-    def ask(self, company_id: str, task: str, use_context: bool = True) -> str:
-        if not use_context:
-            response = self.client.models.generate_content(
-                model=self.model_name, contents=task
-            )
-            return response.text
+        relevant = self.retriever.build_context(results)
+        relevant["query_embedding"] = context["query_embedding"]
+        return relevant
 
-        context = self.get_company_context(company_id, task)
+    def build_contextual_prompt(self, task: str, context: Optional[Dict]) -> str:
+        """Prompt for ``task`` given an already-retrieved ``context``; pass
+        ``None`` when the query does not use context."""
+        if context is None:
+            return task
 
         if not context["raw_results"]:
-            prompt = f"""No relevant past context found for this task.
+            return f"""No relevant past context found for this task.
 
 User's task: {task}
 
 Provide general best practices and guidance."""
-            response = self.client.models.generate_content(
-                model=self.model_name, contents=prompt
-            )
-            return response.text
 
-        prompt = self.build_prompt(task, context)
+        return self.build_prompt(task, context)
+
+    @staticmethod
+    def finished(response) -> bool:
+        """Whether the model stopped on its own, rather than at the token
+        limit or a safety filter; only such answers are worth caching."""
+        candidates = response.candidates or []
+        reason = candidates[0].finish_reason if candidates else None
+        return reason is not None and reason.name == "STOP"
+
+    def context_used(self, context: Optional[Dict]) -> List[Dict]:
+        if not context:
+            return []
+
+        return [
+            {
+                "point_id": str(result.id),
+                "score": result.score,
+                "source": result.payload.get("source", "unknown"),
+                "sprint": result.payload.get("sprint", 0),
+            }
+            for result in context["raw_results"]
+        ]
+
+
+class ContextualLLM(BaseContextualLLM):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "gemini-2.5-flash",
+        client: Optional[genai.Client] = None,
+        retriever: Optional[DataRetriever] = None,
+        budget: Optional[PromptBudget] = None,
+    ):
+        super().__init__(api_key, model, client, budget)
+        self.retriever = retriever or DataRetriever()
+
+    def get_company_context(
+        self,
+        company_id: str,
+        task: str,
+        limit: int = 10,
+        filters: Optional[SearchFilters] = None,
+        diversity: float = 0.0,
+    ) -> Dict:
+        """``diversity`` in [0, 1] re-ranks the hits by maximal marginal
+        relevance so near-identical items don't fill the top ``limit``."""
+        return self.relevant_context(
+            self.retriever.get_context(company_id, task, limit, filters, diversity)
+        )
+
+    def generate(self, prompt: str) -> str:
         response = self.client.models.generate_content(
             model=self.model_name, contents=prompt
         )
-
         return response.text
 
+    def ask(
+        self,
+        company_id: str,
+        task: str,
+        use_context: bool = True,
+        limit: int = 10,
+        context: Optional[Dict] = None,
+        filters: Optional[SearchFilters] = None,
+        diversity: float = 0.0,
+    ) -> str:
+        if use_context and context is None:
+            context = self.get_company_context(
+                company_id, task, limit, filters, diversity
+            )
+
+        return self.generate(
+            self.build_contextual_prompt(task, context if use_context else None)
+        )
+
     def compare_with_without_context(
         self, company_id: str, task: str
     ) -> Dict[str, str]:
@@ -99,3 +171,75 @@ Provide general best practices and guidance."""
         without_context = self.ask(company_id, task, use_context=False)
 
         return {"with_context": with_context, "without_context": without_context}
+
+
+class AsyncContextualLLM(BaseContextualLLM):
+    """Non-blocking counterpart of ContextualLLM for the request path."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "gemini-2.5-flash",
+        client: Optional[genai.Client] = None,
+        retriever: Optional[AsyncDataRetriever] = None,
+        budget: Optional[PromptBudget] = None,
+    ):
+        super().__init__(api_key, model, client, budget)
+        self.retriever = retriever or AsyncDataRetriever()
+
+    async def get_company_context(
+        self,
+        company_id: str,
+        task: str,
+        limit: int = 10,
+        filters: Optional[SearchFilters] = None,
+        diversity: float = 0.0,
+    ) -> Dict:
+        return self.relevant_context(
+            await self.retriever.get_context(
+                company_id, task, limit, filters, diversity
+            )
+        )
+
+    async def get_company_contexts(
+        self,
+        company_id: str,
+        tasks: List[str],
+        limit: int = 10,
+        filters: Optional[SearchFilters] = None,
+        diversity: float = 0.0,
+    ) -> List[Dict]:
+        contexts = await self.retriever.get_context_batch(
+            company_id, tasks, limit, filters, diversity
+        )
+        return [self.relevant_context(context) for context in contexts]
+
+    async def generate(self, prompt: str) -> str:
+        return (await self.generate_checked(prompt))[0]
+
+    async def generate_checked(self, prompt: str) -> Tuple[str, bool]:
+        """Generated text, empty if there is none, and whether the model
+        finished normally."""
+        response = await self.client.aio.models.generate_content(
+            model=self.model_name, contents=prompt
+        )
+        return response.text or "", self.finished(response)
+
+    async def ask(
+        self,
+        company_id: str,
+        task: str,
+        use_context: bool = True,
+        limit: int = 10,
+        context: Optional[Dict] = None,
+        filters: Optional[SearchFilters] = None,
+        diversity: float = 0.0,
+    ) -> str:
+        if use_context and context is None:
+            context = await self.get_company_context(
+                company_id, task, limit, filters, diversity
+            )
+
+        return await self.generate(
+            self.build_contextual_prompt(task, context if use_context else None)
+        )
@@ -1,20 +1,134 @@
-from ingestor import DataIngestor
+from .company_metadata import IngestManifest
+from .embedding_cache import EmbeddingCache
+from .ingestor import DataIngestor
+from .resources import ResourceSettings
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pymongo import MongoClient
+from qdrant_client import QdrantClient
+import argparse
+import ollama
 import os
+import threading
+import time
 
 
-def db_init():
-    ingestor = DataIngestor()
-    base_dir = "company_data"
+def ingest_one(ingestor: DataIngestor, company: str, company_path: str) -> dict:
+    try:
+        return ingestor.ingest_company(company, company_path)
+    except Exception as e:
+        return {"success": False, "company_id": company, "error": str(e)}
 
-    companies = [
+
+def db_init(
+    base_dir: str = "company_data",
+    workers: int = 1,
+    embed_concurrency: int = None,
+    upgrade_legacy: bool = False,
+) -> list:
+    """Ingest every company directory under ``base_dir``.
+
+    Up to ``workers`` companies are ingested at once, sharing one limit of
+    ``embed_concurrency`` in-flight embedding requests. A company that fails
+    is reported and does not stop the others. With ``upgrade_legacy``,
+    single-vector collections are recreated with the hybrid layout.
+    """
+    settings = ResourceSettings()
+    embed_concurrency = embed_concurrency or settings.embed_concurrency
+
+    qdrant = QdrantClient(
+        url=settings.qdrant_url,
+        timeout=settings.qdrant_timeout,
+        pool_size=max(settings.qdrant_pool_size, workers),
+    )
+    mongo = MongoClient(settings.mongo_uri, maxPoolSize=settings.mongo_max_pool_size)
+    embedding_cache = EmbeddingCache()
+
+    ingestor = DataIngestor(
+        qdrant,
+        ollama.Client(host=settings.ollama_host, timeout=settings.ollama_timeout),
+        embed_batch_size=settings.embed_batch_size,
+        embed_concurrency=embed_concurrency,
+        embedding_cache=embedding_cache,
+        manifest=IngestManifest(mongo),
+        embed_semaphore=threading.BoundedSemaphore(embed_concurrency),
+        slim_payloads=settings.slim_payloads,
+        quantization=settings.quantization,
+        mrl_dims=settings.mrl_dims,
+        upgrade_legacy=upgrade_legacy,
+    )
+
+    companies = sorted(
         d for d in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, d))
-    ]
+    )
+
+    print(
+        f"Ingesting data for {len(companies)} companies "
+        f"({workers} workers, {embed_concurrency} concurrent embeddings)"
+    )
+
+    started = time.perf_counter()
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            futures = [
+                pool.submit(ingest_one, ingestor, company, os.path.join(base_dir, company))
+                for company in companies
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if not result["success"]:
+                    print(f"[{result['company_id']}] failed: {result['error']}")
+    finally:
+        embedding_cache.close()
+        mongo.close()
+        qdrant.close()
+
+    elapsed = time.perf_counter() - started
+    succeeded = [r for r in results if r["success"]]
+    failed = [r["company_id"] for r in results if not r["success"]]
+    processed = sum(
+        r["items_ingested"] + r["items_updated"] + r["items_unchanged"]
+        for r in succeeded
+    )
+    ingested = sum(r["items_ingested"] for r in succeeded)
+
+    print(
+        f"Done in {elapsed:.1f}s: {len(succeeded)}/{len(results)} companies, "
+        f"{ingested} items ingested, {processed} processed "
+        f"({processed / elapsed if elapsed else 0.0:.1f} items/s)"
+    )
+    if failed:
+        print(f"Failed companies: {', '.join(sorted(failed))}")
 
-    print("Ingesting data")
+    return results
 
-    for company in companies:
-        company_path = os.path.join(base_dir, company)
-        ingestor.ingest_company(company, company_path)
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load company data into Qdrant")
+    parser.add_argument("--data-dir", default="company_data")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("DB_INIT_WORKERS", "4")),
+        help="companies ingested concurrently",
+    )
+    parser.add_argument(
+        "--embed-concurrency",
+        type=int,
+        default=None,
+        help="embedding requests in flight across all companies "
+        "(defaults to EMBED_CONCURRENCY)",
+    )
+    parser.add_argument(
+        "--upgrade-legacy",
+        action="store_true",
+        help="recreate single-vector collections with dense and sparse vectors",
+    )
+    args = parser.parse_args()
 
-db_init()
+    results = db_init(
+        args.data_dir, args.workers, args.embed_concurrency, args.upgrade_legacy
+    )
+    if not all(r["success"] for r in results):
+        raise SystemExit(1)
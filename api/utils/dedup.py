@@ -0,0 +1,141 @@
+import hashlib
+import os
+import random
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_TOKEN = re.compile(r"\w+")
+
+
+class Deduplicator:
+    """Flags exact and near-duplicate texts within one ingest run.
+
+    Exact duplicates are caught by hashing the normalized text. Near
+    duplicates are found with MinHash signatures over word shingles and
+    locality-sensitive hashing bands, then confirmed by the estimated
+    Jaccard similarity reaching ``threshold``. Only the latest
+    ``max_entries`` texts are remembered, so a large run holds bounded
+    state; older ones are forgotten first.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 5,
+        max_entries: Optional[int] = None,
+    ):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.max_entries = (
+            max_entries
+            if max_entries is not None
+            else int(os.getenv("DEDUP_MAX_ENTRIES", "100000"))
+        )
+
+        # 32-bit shingle hashes and coefficients keep a * h below 2**64, so
+        # the permutations run exactly in uint64 over all shingles at once
+        rng = random.Random(1)
+        self.perm_a = np.array(
+            [rng.randrange(1, 1 << 32) for _ in range(num_perm)], dtype=np.uint64
+        )
+        self.perm_b = np.array(
+            [rng.randrange(0, 1 << 32) for _ in range(num_perm)], dtype=np.uint64
+        )
+
+        # entry id -> (text digest, signature), oldest first
+        self.entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self.next_id = 0
+        self.exact_hashes: Dict[bytes, int] = {}
+        self.band_index: Dict[tuple, List[int]] = {}
+        self.stats = {"exact_duplicates": 0, "near_duplicates": 0}
+
+    @property
+    def near_enabled(self) -> bool:
+        return bool(self.threshold) and self.threshold < 1
+
+    def check(self, text: str) -> Optional[str]:
+        """Return ``"exact"`` or ``"near"`` for a duplicate; otherwise remember
+        ``text`` and return ``None``."""
+        tokens = _TOKEN.findall(text.lower())
+
+        digest = hashlib.sha256(" ".join(tokens).encode("utf-8")).digest()
+        if digest in self.exact_hashes:
+            self.stats["exact_duplicates"] += 1
+            return "exact"
+
+        signature = None
+        bands = []
+        if self.near_enabled:
+            signature = self.signature(tokens)
+            bands = self.band_keys(signature)
+            candidates = {i for key in bands for i in self.band_index.get(key, [])}
+            for i in candidates:
+                if self.similarity(signature, self.entries[i][1]) >= self.threshold:
+                    self.stats["near_duplicates"] += 1
+                    return "near"
+
+        self._remember(digest, signature, bands)
+        return None
+
+    def _remember(self, digest: bytes, signature: Optional[np.ndarray], bands: list):
+        if self.max_entries <= 0:
+            return
+        while len(self.entries) >= self.max_entries:
+            self._forget_oldest()
+
+        entry_id = self.next_id
+        self.next_id += 1
+        self.entries[entry_id] = (digest, signature)
+        self.exact_hashes[digest] = entry_id
+        for key in bands:
+            self.band_index.setdefault(key, []).append(entry_id)
+
+    def _forget_oldest(self):
+        entry_id, (digest, signature) = self.entries.popitem(last=False)
+        del self.exact_hashes[digest]
+        if signature is None:
+            return
+        for key in self.band_keys(signature):
+            ids = self.band_index[key]
+            ids.remove(entry_id)
+            if not ids:
+                del self.band_index[key]
+
+    def band_keys(self, signature: np.ndarray) -> List[tuple]:
+        return [
+            (band, signature[band * self.rows : (band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def signature(self, tokens: List[str]) -> np.ndarray:
+        size = self.shingle_size
+        shingles = {
+            " ".join(tokens[i : i + size])
+            for i in range(max(len(tokens) - size + 1, 1))
+        }
+        hashes = np.fromiter(
+            (
+                int.from_bytes(
+                    hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "big"
+                )
+                for s in shingles
+            ),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        # (shingles x permutations) products, reduced to each permutation's min
+        values = (hashes[:, None] * self.perm_a) % _MERSENNE_PRIME
+        values = (values + self.perm_b) % _MERSENNE_PRIME
+        return values.min(axis=0)
+
+    def similarity(self, left: np.ndarray, right: np.ndarray) -> float:
+        return int(np.count_nonzero(left == right)) / self.num_perm
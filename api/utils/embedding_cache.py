@@ -0,0 +1,124 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import List, Optional, Sequence
+
+
+class EmbeddingCache:
+    """Disk-backed embedding store keyed by a hash of (model, text).
+
+    Vectors are kept as packed float32 blobs in SQLite. When the cache grows
+    past ``max_entries`` the least recently used tenth is evicted.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None):
+        self.path = path or os.getenv(
+            "EMBEDDING_CACHE_PATH", os.path.join(".cache", "donna", "embeddings.sqlite3")
+        )
+        self.max_entries = (
+            max_entries
+            if max_entries is not None
+            else int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+        )
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                key BLOB PRIMARY KEY,
+                vector BLOB NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_accessed ON embeddings(accessed_at)"
+        )
+        self.size = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def key(model: str, text: str) -> bytes:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).digest()
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        keys = [self.key(model, text) for text in texts]
+        found = {}
+
+        with self.lock:
+            # SQLite caps bound parameters, so look keys up in slices.
+            for i in range(0, len(keys), 500):
+                chunk = keys[i : i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                found.update(rows)
+
+                hits = [k for k in chunk if k in found]
+                if hits:
+                    self.conn.execute(
+                        f"UPDATE embeddings SET accessed_at = ? "
+                        f"WHERE key IN ({','.join('?' * len(hits))})",
+                        [time.time(), *hits],
+                    )
+
+        return [self._decode(found[k]) if k in found else None for k in keys]
+
+    def put_many(
+        self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]
+    ):
+        now = time.time()
+        rows = [
+            (self.key(model, text), array("f", vector).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        if not rows:
+            return
+
+        with self.lock:
+            self.conn.execute("BEGIN")
+            cursor = self.conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, accessed_at) "
+                "VALUES (?, ?, ?)",
+                rows,
+            )
+            self.conn.execute("COMMIT")
+            self.size += max(cursor.rowcount, 0)
+
+            if self.size > self.max_entries:
+                self._evict()
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model, [text])[0]
+
+    def put(self, model: str, text: str, vector: Sequence[float]):
+        self.put_many(model, [text], [vector])
+
+    def _evict(self):
+        target = int(self.max_entries * 0.9)
+        self.conn.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            "SELECT key FROM embeddings ORDER BY accessed_at LIMIT ?)",
+            (self.size - target,),
+        )
+        self.size = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def _decode(blob: bytes) -> List[float]:
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    def close(self):
+        self.conn.close()
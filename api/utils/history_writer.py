@@ -0,0 +1,91 @@
+import asyncio
+import traceback
+from typing import Dict, List, Optional
+
+from .company_metadata import AsyncChatHistory
+
+
+class HistoryWriter:
+    """Write-behind queue for chat messages.
+
+    Handlers enqueue a message without waiting and one background task
+    writes whatever has queued up in bulk, so persisting a streamed reply
+    adds nothing to the stream. Each message's ``seq`` is reserved by the
+    handler beforehand (see ``add_message(reserve_reply=True)``), so it
+    lands in order however late it is written. ``close`` flushes what is
+    still queued. Messages are dropped (and counted) when ``max_pending``
+    are waiting.
+    """
+
+    def __init__(
+        self,
+        chat_history: AsyncChatHistory,
+        max_pending: int = 10000,
+        batch_size: int = 100,
+    ):
+        self.chat_history = chat_history
+        self.queue: asyncio.Queue = asyncio.Queue(max_pending)
+        self.batch_size = batch_size
+        self.task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    def enqueue(
+        self,
+        session_id: str,
+        seq: int,
+        role: str,
+        content: str,
+        context_used: List[Dict] = None,
+        metadata: Optional[Dict] = None,
+    ) -> bool:
+        message = self.chat_history.new_message(
+            role, content, context_used, metadata, seq=seq
+        )
+        try:
+            self.queue.put_nowait((session_id, message))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            try:
+                await self.chat_history.write_messages(batch)
+                self.written += len(batch)
+            except Exception:
+                traceback.print_exc()
+                self.failed += len(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def close(self, timeout: float = 10.0):
+        if self.task is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"History writer closed with {self.queue.qsize()} messages unwritten")
+        self.task.cancel()
+        self.task = None
+
+    def stats(self) -> Dict:
+        return {
+            "pending": self.queue.qsize(),
+            "written": self.written,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
@@ -1,34 +1,259 @@
 import os
-import json
+import threading
+import uuid
 import ollama
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import List, Optional
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from qdrant_client.models import (
+    Distance,
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    HasIdCondition,
+    HnswConfigDiff,
+    MatchAny,
+    Modifier,
+    PayloadSchemaType,
+    PointIdsList,
+    PointStruct,
+    SetPayload,
+    SetPayloadOperation,
+    SparseVectorParams,
+    VectorParams,
+)
 from tqdm import tqdm
 
+from .answer_cache import SemanticAnswerCache
+from .cache import SearchCache
+from .chunker import Chunker
+from .company_metadata import CompanyDataStore, IngestManifest
+from .dedup import Deduplicator
+from .embedding_cache import EmbeddingCache
+from .item_reader import batched, iter_file_items
+from .items import canonical_json, chunk_point_id, content_hash, item_point_id
+from .matryoshka import MRL_VECTOR, collection_mrl_dims, truncate
+from .quantize import quantization_config
+from .sparse import DENSE_VECTOR, SPARSE_VECTOR, SparseEncoder, is_hybrid
+
+# Payload fields filtered on at query time; see retriever.SearchFilters
+PAYLOAD_INDEXES = {
+    "source": PayloadSchemaType.KEYWORD,
+    "sprint": PayloadSchemaType.INTEGER,
+    "bug_stage": PayloadSchemaType.KEYWORD,
+    "parent_id": PayloadSchemaType.KEYWORD,
+}
 
 class DataIngestor:
-    def __init__(self):
-        self.client = QdrantClient("http://localhost:6333")
+    def __init__(
+        self,
+        client: Optional[QdrantClient] = None,
+        embedder: Optional[ollama.Client] = None,
+        embed_batch_size: int = 64,
+        embed_concurrency: int = 4,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        search_cache: Optional[SearchCache] = None,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        manifest: Optional[IngestManifest] = None,
+        near_duplicate_threshold: float = 0.9,
+        upsert_batch_size: int = 256,
+        embed_semaphore: Optional[threading.Semaphore] = None,
+        slim_payloads: bool = False,
+        data_store: Optional[CompanyDataStore] = None,
+        quantization: Optional[str] = None,
+        mrl_dims: int = 0,
+        chunker: Optional[Chunker] = None,
+        upgrade_legacy: bool = False,
+    ):
+        self.client = client or QdrantClient("http://localhost:6333")
+        self.embedder = embedder or ollama.Client()
+        self.embedding_cache = embedding_cache or EmbeddingCache()
+        self.search_cache = search_cache
+        self.answer_cache = answer_cache
+        self.manifest = manifest or IngestManifest()
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.upsert_batch_size = upsert_batch_size
         self.embedding_model = "nomic-embed-text"
+        self.embed_batch_size = embed_batch_size
+        self.embed_concurrency = embed_concurrency
+        # Shared across ingestors (or threads) to cap Ollama requests globally
+        self.embed_semaphore = embed_semaphore
+        # Slim points carry only filter fields and an item reference; the
+        # item itself lives in the company_data collection.
+        self.slim_payloads = slim_payloads
+        self.data_store = data_store
+        if slim_payloads and data_store is None:
+            self.data_store = CompanyDataStore(self.manifest.client)
+        self.sparse_encoder = SparseEncoder()
+        # "int8" or "binary" for new collections; see quantize.py
+        self.quantization = quantization_config(quantization)
+        # collection name -> {"hybrid": has the sparse vector alongside
+        # dense, "mrl_dims": size of the truncated vector, 0 if none}
+        self.collection_layouts = {}
+        self.mrl_dims = mrl_dims
+        # Long items are embedded as overlapping chunks, one point each
+        self.chunker = chunker or Chunker()
+        # Recreate single-vector collections with the hybrid layout when
+        # their directory is re-ingested; see upgrade_legacy_collection
+        self.upgrade_legacy = upgrade_legacy
 
     def setup_company(self, company_id: str):
         collection_name = f"company_{company_id}"
 
-        try:
-            self.client.get_collection(collection_name)
+        # Only a missing collection is created; any other error surfaces
+        if self.client.collection_exists(collection_name):
+            info = self.client.get_collection(collection_name)
+            indexed = info.payload_schema
+            self.collection_layouts[collection_name] = {
+                "hybrid": is_hybrid(info),
+                "mrl_dims": collection_mrl_dims(info),
+            }
+            if not (info.config.metadata or {}).get("generation"):
+                self._bump_generation(collection_name)
             print(f"{collection_name} exists")
-        except:
+            if not self.collection_layouts[collection_name]["hybrid"]:
+                print(
+                    f"WARNING: {collection_name} has a single unnamed vector and "
+                    "only gets dense search; re-ingest it with "
+                    "`db_init --upgrade-legacy` to enable hybrid search"
+                )
+        else:
+            vectors_config = {
+                DENSE_VECTOR: VectorParams(
+                    size=768,
+                    distance=Distance.COSINE,
+                    on_disk=self.quantization is not None,
+                )
+            }
+            if self.mrl_dims:
+                # Searched first; the full vector only rescores its shortlist,
+                # so it is kept on disk and not HNSW-indexed.
+                vectors_config[MRL_VECTOR] = VectorParams(
+                    size=self.mrl_dims, distance=Distance.COSINE
+                )
+                vectors_config[DENSE_VECTOR].on_disk = True
+                vectors_config[DENSE_VECTOR].hnsw_config = HnswConfigDiff(m=0)
+
             self.client.create_collection(
                 collection_name=collection_name,
-                vectors_config=VectorParams(size=768, distance=Distance.COSINE),
+                vectors_config=vectors_config,
+                quantization_config=self.quantization,
+                sparse_vectors_config={
+                    SPARSE_VECTOR: SparseVectorParams(modifier=Modifier.IDF)
+                },
+                metadata={"generation": uuid.uuid4().hex},
             )
+            indexed = {}
+            self.collection_layouts[collection_name] = {
+                "hybrid": True,
+                "mrl_dims": self.mrl_dims,
+            }
             print(f"{collection_name} created")
 
+        for field, schema in PAYLOAD_INDEXES.items():
+            if field not in indexed:
+                self.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field,
+                    field_schema=schema,
+                )
+
         return collection_name
 
     def embed(self, text: str):
-        result = ollama.embeddings(model=self.embedding_model, prompt=text)
-        return result["embedding"]
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, serving repeats from the embedding cache. Order
+        matches ``texts``."""
+        vectors = self.embedding_cache.get_many(self.embedding_model, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if not missing:
+            return vectors
+
+        unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+        embedded = self._embed_batched(unique_texts)
+        self.embedding_cache.put_many(self.embedding_model, unique_texts, embedded)
+
+        by_text = dict(zip(unique_texts, embedded))
+        for i in missing:
+            vectors[i] = by_text[texts[i]]
+        return vectors
+
+    def _embed_batched(self, texts: List[str]) -> List[List[float]]:
+        """Send texts to Ollama in batches of ``embed_batch_size``, with at most
+        ``embed_concurrency`` batches in flight."""
+        batches = [
+            texts[i : i + self.embed_batch_size]
+            for i in range(0, len(texts), self.embed_batch_size)
+        ]
+        if len(batches) <= 1:
+            return [e for batch in batches for e in self._embed_many(batch)]
+
+        workers = min(self.embed_concurrency, len(batches))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(self._embed_many, batches))
+        return [e for batch in results for e in batch]
+
+    def _embed_many(self, texts: List[str]) -> List[List[float]]:
+        with self.embed_semaphore or nullcontext():
+            result = self.embedder.embed(model=self.embedding_model, input=texts)
+        return result["embeddings"]
+
+    def point_vector(self, collection_name: str, content: str, embedding: List[float]):
+        layout = self.collection_layouts.get(collection_name, {})
+        if not layout.get("hybrid"):
+            return embedding
+
+        vector = {
+            DENSE_VECTOR: embedding,
+            SPARSE_VECTOR: self.sparse_encoder.encode_document(content),
+        }
+        if layout.get("mrl_dims"):
+            vector[MRL_VECTOR] = truncate(embedding, layout["mrl_dims"])
+        return vector
+
+    def item_payload(
+        self, company_id: str, point_id: str, item: dict, default_source: str
+    ) -> dict:
+        """Payload fields shared by all of an item's chunks; they come from
+        the item's metadata, not its text."""
+        payload = {
+            "company_id": company_id,
+            "item_id": point_id,
+            "parent_id": point_id,
+            "source": item.get("source", default_source),
+            "sprint": item.get("sprint", 0),
+            "bug_stage": item.get("bug_stage", ""),
+        }
+        if not self.slim_payloads:
+            payload["sprint_focus"] = item.get("sprint_focus", "")
+        return payload
+
+    def build_payload(
+        self,
+        company_id: str,
+        point_id: str,
+        item: dict,
+        content: str,
+        default_source: str,
+        chunk_index: int = 0,
+    ) -> dict:
+        """Payload for one chunk of an item; ``point_id`` is the item's id,
+        shared by all of its chunks, and ``content`` is the chunk text."""
+        payload = self.item_payload(company_id, point_id, item, default_source)
+        payload["chunk_index"] = chunk_index
+        if not self.slim_payloads:
+            payload["content"] = self.snippet(content)
+            if chunk_index == 0:
+                # Later chunks are hydrated from the first one by parent_id
+                payload["full_data"] = item
+        return payload
+
+    def snippet(self, content: str) -> str:
+        # Chunks are already bounded; whole items are capped as before
+        return content if self.chunker.enabled else content[:1000]
 
     def extract_content(self, item: dict) -> str:
         parts = []
@@ -96,88 +321,107 @@ class DataIngestor:
 
         return " | ".join(filter(None, parts))
 
-    def ingest_company(self, company_id: str, directory: str):
+    def ingest_company(self, company_id: str, directory: str) -> dict:
         collection_name = self.setup_company(company_id)
-
-        files = [f for f in os.listdir(directory) if f.endswith(".json")]
+        scope = f"directory:{os.path.basename(os.path.normpath(directory))}"
+        layout = self.collection_layouts[collection_name]
+        if self.upgrade_legacy and not layout["hybrid"]:
+            collection_name = self.upgrade_legacy_collection(company_id, scope)
+        self._prepare_manifest(company_id, collection_name)
+        moved = self._migrate_legacy_points(company_id, collection_name)
+        if moved:
+            print(f"[{company_id}] {moved} legacy points moved to item ids")
+
+        files = sorted(f for f in os.listdir(directory) if f.endswith(".json"))
         print(f"[{company_id}] {len(files)} files found")
 
-        point_id = 0
+        stats = self._new_stats()
+        stats["items_deleted"] = 0
+        seen = set()
+        dedup = Deduplicator(self.near_duplicate_threshold)
 
         for file in tqdm(files, desc=f"Ingesting {company_id}"):
             path = os.path.join(directory, file)
 
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            if isinstance(data, dict):
-                if "data" in data:
-                    items = data["data"]
-                elif any(
-                    k in data
-                    for k in ["github_commits", "slack_conversations", "jira_tickets"]
-                ):
-                    items = []
-                    for section in [
-                        "github_commits",
-                        "slack_conversations",
-                        "jira_tickets",
-                        "confluence_docs",
-                        "google_docs",
-                    ]:
-                        if section in data:
-                            section_items = (
-                                data[section]
-                                if isinstance(data[section], list)
-                                else [data[section]]
-                            )
-                            items.extend(section_items)
-                else:
-                    items = [data]
-            elif isinstance(data, list):
-                items = data
-            else:
-                items = [data]
-
-            points = []
-            for item in items:
-                content = self.extract_content(item)
-                embedding = self.embed(content)
-
-                points.append(
-                    PointStruct(
-                        id=point_id,
-                        vector=embedding,
-                        payload={
-                            "company_id": company_id,
-                            "source": item.get("source", "unknown"),
-                            "sprint": item.get("sprint", 0),
-                            "sprint_focus": item.get("sprint_focus", ""),
-                            "bug_stage": item.get("bug_stage", ""),
-                            "content": content[:1000],
-                            "full_data": item,
-                        },
-                    )
+            for items in batched(iter_file_items(path), self.upsert_batch_size):
+                self._ingest_items(
+                    company_id,
+                    collection_name,
+                    items,
+                    scope,
+                    "unknown",
+                    seen,
+                    dedup,
+                    stats,
                 )
-                point_id += 1
-
-            if points:
-                self.client.upsert(collection_name=collection_name, points=points)
 
-        print(f"[{company_id}] {point_id} items ingested")
-        return collection_name
+        # Anything this directory produced before but no longer contains
+        stale = list(self.manifest.point_ids(company_id, scope) - seen)
+        if stale:
+            self._delete_items(collection_name, stale)
+            self.manifest.remove(company_id, stale)
+            if self.data_store is not None:
+                self.data_store.remove_items(company_id, stale)
+        stats["items_deleted"] = len(stale)
+
+        if stats["items_ingested"] or stats["items_updated"] or stale or moved:
+            self._mark_changed(company_id, collection_name)
+
+        print(
+            f"[{company_id}] {stats['items_ingested']} items ingested, "
+            f"{stats['items_updated']} updated, "
+            f"{stats['items_unchanged']} unchanged, {stats['items_deleted']} deleted, "
+            f"{stats['exact_duplicates']} exact and "
+            f"{stats['near_duplicates']} near duplicates dropped"
+        )
+        return {
+            "success": True,
+            "company_id": company_id,
+            "collection_name": collection_name,
+            **stats,
+        }
 
     def ingest_data(self, company_id: str, data: list) -> dict:
         collection_name = self.setup_company(company_id)
+        self._prepare_manifest(company_id, collection_name)
 
         if not isinstance(data, list):
             data = [data]
 
-        point_id_start = self._get_next_point_id(collection_name)
-        point_id = point_id_start
+        stats = self._new_stats()
+        seen = set()
+        dedup = Deduplicator(self.near_duplicate_threshold)
+        for items in batched(data, self.upsert_batch_size):
+            self._ingest_items(
+                company_id, collection_name, items, "api", "custom", seen, dedup, stats
+            )
+
+        if stats["items_ingested"] or stats["items_updated"]:
+            self._mark_changed(company_id, collection_name)
+
+        return {
+            "success": True,
+            "company_id": company_id,
+            "collection_name": collection_name,
+            **stats,
+        }
 
-        points = []
-        for item in data:
+    def _ingest_items(
+        self,
+        company_id: str,
+        collection_name: str,
+        items: list,
+        scope: str,
+        default_source: str,
+        seen: set,
+        dedup: Deduplicator,
+        stats: dict,
+    ):
+        """Embed and upsert the items that are new or changed since the last
+        run; ``seen`` collects every point id this run touched. Exact and
+        near-duplicate items are dropped before embedding."""
+        candidates = []
+        for item in items:
             if not isinstance(item, dict):
                 continue
 
@@ -185,44 +429,315 @@ class DataIngestor:
             if not content.strip():
                 continue
 
-            embedding = self.embed(content)
-
-            points.append(
-                PointStruct(
-                    id=point_id,
-                    vector=embedding,
-                    payload={
-                        "company_id": company_id,
-                        "source": item.get("source", "custom"),
-                        "sprint": item.get("sprint", 0),
-                        "sprint_focus": item.get("sprint_focus", ""),
-                        "bug_stage": item.get("bug_stage", ""),
-                        "content": content[:1000],
-                        "full_data": item,
-                    },
-                )
+            point_id = item_point_id(company_id, item)
+            if point_id in seen:
+                stats["exact_duplicates"] += 1
+                continue
+
+            duplicate = dedup.check(content)
+            if duplicate:
+                stats[f"{duplicate}_duplicates"] += 1
+                continue
+
+            seen.add(point_id)
+            # The chunk settings are part of both hashes so changing them
+            # re-chunks existing items on the next run. Only a change to the
+            # embedded text needs new vectors; other edits to the item just
+            # rewrite its stored payload.
+            signature = self.chunker.signature
+            digest = {
+                "content_hash": content_hash(signature + content),
+                "item_hash": content_hash(signature + canonical_json(item)),
+            }
+            candidates.append((point_id, item, content, digest))
+
+        known = self.manifest.get_hashes(company_id, [c[0] for c in candidates])
+        changed, edited = [], []
+        for candidate in candidates:
+            recorded = known.get(candidate[0], {})
+            digest = candidate[3]
+            if recorded.get("content_hash") != digest["content_hash"]:
+                changed.append(candidate)
+            elif recorded.get("item_hash") != digest["item_hash"]:
+                edited.append(candidate)
+        stats["items_unchanged"] += len(candidates) - len(changed) - len(edited)
+
+        if edited:
+            self._update_items(
+                company_id, collection_name, edited, scope, default_source
             )
-            point_id += 1
+            stats["items_updated"] += len(edited)
+        if not changed:
+            return
 
-        if points:
-            self.client.upsert(collection_name=collection_name, points=points)
+        chunks = {
+            point_id: self.chunker.split(content) for point_id, _, content, _ in changed
+        }
+        texts = [chunk for point_id, _, _, _ in changed for chunk in chunks[point_id]]
+        embeddings = iter(self.embed_batch(texts))
+
+        if self.slim_payloads:
+            # Store items first so no point ever references a missing document
+            self.data_store.upsert_items(
+                company_id,
+                {
+                    point_id: self.item_document(item, chunks[point_id])
+                    for point_id, item, _, _ in changed
+                },
+                default_source=default_source,
+            )
 
-        items_ingested = point_id - point_id_start
+        # An edited item may now have fewer chunks than before
+        replaced = [c[0] for c in changed if known.get(c[0]) is not None]
+        if replaced:
+            self._delete_items(collection_name, replaced)
+
+        points = [
+            PointStruct(
+                id=chunk_point_id(point_id, index),
+                vector=self.point_vector(collection_name, chunk, next(embeddings)),
+                payload=self.build_payload(
+                    company_id, point_id, item, chunk, default_source, index
+                ),
+            )
+            for point_id, item, _, _ in changed
+            for index, chunk in enumerate(chunks[point_id])
+        ]
+        for start in range(0, len(points), self.upsert_batch_size):
+            self.client.upsert(
+                collection_name=collection_name,
+                points=points[start : start + self.upsert_batch_size],
+            )
+        self.manifest.record(
+            company_id, scope, {point_id: digest for point_id, _, _, digest in changed}
+        )
+        stats["items_ingested"] += len(changed)
+        stats["chunks_ingested"] += len(points)
+
+    def _update_items(
+        self,
+        company_id: str,
+        collection_name: str,
+        edited: list,
+        scope: str,
+        default_source: str,
+    ):
+        """Rewrite the stored payload of items whose embedded text is
+        unchanged, without re-embedding them."""
+        if self.slim_payloads:
+            self.data_store.upsert_items(
+                company_id,
+                {
+                    point_id: self.item_document(item, self.chunker.split(content))
+                    for point_id, item, content, _ in edited
+                },
+                default_source=default_source,
+            )
+
+        operations = []
+        for point_id, item, _, _ in edited:
+            operations.append(
+                SetPayloadOperation(
+                    set_payload=SetPayload(
+                        payload=self.item_payload(
+                            company_id, point_id, item, default_source
+                        ),
+                        filter=self._item_filter([point_id]),
+                    )
+                )
+            )
+            if not self.slim_payloads:
+                operations.append(
+                    SetPayloadOperation(
+                        set_payload=SetPayload(
+                            payload={"full_data": item}, points=[point_id]
+                        )
+                    )
+                )
+        for start in range(0, len(operations), self.upsert_batch_size):
+            self.client.batch_update_points(
+                collection_name=collection_name,
+                update_operations=operations[start : start + self.upsert_batch_size],
+            )
+        self.manifest.record(
+            company_id, scope, {point_id: digest for point_id, _, _, digest in edited}
+        )
+
+    def item_document(self, item: dict, chunks: List[str]) -> dict:
+        """Mongo document for a slim item; hits on a later chunk are
+        hydrated with that chunk's text from ``chunks``."""
+        document = {"data": item, "content": self.snippet(chunks[0])}
+        if len(chunks) > 1:
+            document["chunks"] = chunks
+        return document
+
+    def _delete_items(self, collection_name: str, item_ids: List[str]):
+        """Delete every chunk of the given items, including points written
+        before chunking, which carry the item id but no parent_id."""
+        self.client.delete(
+            collection_name=collection_name,
+            points_selector=FilterSelector(filter=self._item_filter(item_ids)),
+        )
+
+    def _item_filter(self, item_ids: List[str]) -> Filter:
+        """Every chunk of the given items."""
+        return Filter(
+            should=[
+                HasIdCondition(has_id=item_ids),
+                FieldCondition(key="parent_id", match=MatchAny(any=item_ids)),
+            ]
+        )
+
+    def _new_stats(self) -> dict:
         return {
-            "success": True,
-            "company_id": company_id,
-            "items_ingested": items_ingested,
-            "collection_name": collection_name,
+            "items_ingested": 0,
+            "items_unchanged": 0,
+            "items_updated": 0,
+            "chunks_ingested": 0,
+            "exact_duplicates": 0,
+            "near_duplicates": 0,
+        }
+
+    def upgrade_legacy_collection(self, company_id: str, scope: str) -> str:
+        """Drop a single-vector collection so it is recreated with named
+        dense and sparse vectors, then re-ingested from ``scope``.
+
+        Only a collection whose every point this directory recorded in the
+        manifest is dropped; any other point, such as an item posted
+        through the API or a legacy point not yet moved to its item id,
+        would be lost, so the collection is left as it is. Re-embedding is
+        mostly served by the embedding cache.
+        """
+        collection_name = f"company_{company_id}"
+        own = self.manifest.point_ids(company_id, scope)
+        foreign = 0
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=collection_name,
+                limit=1000,
+                offset=offset,
+                with_payload=["parent_id"],
+            )
+            foreign += sum(
+                1
+                for p in points
+                if (p.payload or {}).get("parent_id", p.id) not in own
+            )
+            if offset is None:
+                break
+
+        if foreign:
+            print(
+                f"{collection_name} not upgraded: {foreign} points were not "
+                f"ingested from {scope}"
+            )
+            return collection_name
+
+        self.client.delete_collection(collection_name)
+        self.collection_layouts.pop(collection_name, None)
+        print(f"{collection_name} dropped for upgrade")
+        return self.setup_company(company_id)
+
+    def _prepare_manifest(self, company_id: str, collection_name: str):
+        self.manifest.ensure_indexes()
+        if self.data_store is not None:
+            self.data_store.ensure_indexes()
+
+        if self.client.count(collection_name=collection_name).count == 0:
+            # The collection was (re)created, so nothing recorded is there.
+            self.manifest.clear(company_id)
+
+    def _migrate_legacy_points(self, company_id: str, collection_name: str) -> int:
+        """Move sequentially numbered points, written before ids were derived
+        from item content, to their item's id, keeping their vectors.
+
+        Each legacy point is deleted only once its replacement is written.
+        Points without ``full_data`` cannot be mapped and are kept. Moved
+        points are not recorded in the manifest, so items that are still in
+        a data directory are rewritten in full by the run that follows.
+        """
+        moved = 0
+        offset = None
+        while True:
+            # Numeric ids scroll before UUIDs, so legacy points come first
+            points, offset = self.client.scroll(
+                collection_name=collection_name,
+                limit=self.upsert_batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            legacy = [p for p in points if isinstance(p.id, int)]
+
+            replacements = {}
+            for point in legacy:
+                payload = point.payload or {}
+                item = payload.get("full_data")
+                if not isinstance(item, dict):
+                    continue
+                replacements[point.id] = (
+                    item_point_id(company_id, item),
+                    item,
+                    payload.get("source", "unknown"),
+                    point.vector,
+                )
+            if replacements:
+                self._write_migrated(company_id, collection_name, replacements)
+                self.client.delete(
+                    collection_name=collection_name,
+                    points_selector=PointIdsList(points=list(replacements)),
+                )
+                moved += len(replacements)
+
+            if len(legacy) < len(points) or offset is None:
+                break
+        return moved
+
+    def _write_migrated(self, company_id: str, collection_name: str, replacements):
+        """Write the replacement points for ``_migrate_legacy_points``;
+        items that already have a point keep it."""
+        new_ids = list({new_id for new_id, _, _, _ in replacements.values()})
+        existing = {
+            p.id
+            for p in self.client.retrieve(
+                collection_name=collection_name, ids=new_ids, with_payload=False
+            )
         }
 
-    def _get_next_point_id(self, collection_name: str) -> int:
-        try:
-            result = self.client.scroll(
-                collection_name=collection_name, limit=1, with_payload=False
-            )
-            if result[0]:
-                max_id = max([point.id for point in result[0]])
-                return max_id + 1
-            return 0
-        except:
-            return 0
+        points = {}
+        for new_id, item, source, vector in replacements.values():
+            if new_id in existing or new_id in points:
+                continue
+            if isinstance(vector, dict):
+                vector = vector.get(DENSE_VECTOR)
+            content = self.extract_content(item)
+            if self.slim_payloads:
+                self.data_store.upsert_items(
+                    company_id,
+                    {new_id: self.item_document(item, [content])},
+                    default_source=source,
+                )
+            points[new_id] = PointStruct(
+                id=new_id,
+                vector=self.point_vector(collection_name, content, vector),
+                payload=self.build_payload(company_id, new_id, item, content, source),
+            )
+        if points:
+            self.client.upsert(
+                collection_name=collection_name, points=list(points.values())
+            )
+
+    def _bump_generation(self, collection_name: str):
+        """Tag the collection's contents with a new generation; in-process
+        indexes snapshot a collection per generation."""
+        self.client.update_collection(
+            collection_name=collection_name,
+            metadata={"generation": uuid.uuid4().hex},
+        )
+
+    def _mark_changed(self, company_id: str, collection_name: str):
+        self._bump_generation(collection_name)
+        for cache in (self.search_cache, self.answer_cache):
+            if cache is not None:
+                cache.invalidate_company(company_id)
@@ -0,0 +1,159 @@
+import json
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, TextIO
+
+SECTION_KEYS = (
+    "github_commits",
+    "slack_conversations",
+    "jira_tickets",
+    "confluence_docs",
+    "google_docs",
+)
+
+_WHITESPACE = " \t\r\n"
+_NUMBER_CHARS = "0123456789.eE+-"
+
+
+class _StreamingJSONReader:
+    """Decodes one JSON value at a time from a file without loading it whole.
+
+    Only the value being decoded is held in memory; the buffer grows while a
+    single value spans more than one read.
+    """
+
+    def __init__(self, file: TextIO, chunk_size: int):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+
+        # Read at least as much as is buffered so a large value is
+        # re-scanned a logarithmic number of times, not once per chunk.
+        pending = len(self.buffer) - self.pos
+        chunk = self.file.read(max(self.chunk_size, pending))
+        if not chunk:
+            self.eof = True
+            return False
+
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON stream, found {found!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        while True:
+            self.peek()
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+
+            # A number cut off by the end of the buffer may continue in the
+            # next read ("1" of "1.5", "2e" of "2e10").
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                tail = end
+                while tail < len(self.buffer) and self.buffer[tail] in _NUMBER_CHARS:
+                    tail += 1
+                if tail == len(self.buffer) and self._fill():
+                    continue
+
+            self.pos = end
+            return value
+
+    def array_items(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self.pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, found {separator!r}")
+
+
+def iter_file_items(path: str, chunk_size: int = 1 << 20) -> Iterator[Any]:
+    """Yield data items from an export file one at a time.
+
+    Understands the layouts DataIngestor accepts: a top-level list, an object
+    with a ``data`` list, an object with per-source sections such as
+    ``github_commits`` or ``slack_conversations``, or a single item object.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _StreamingJSONReader(f, chunk_size)
+
+        first = reader.peek()
+        if first == "[":
+            yield from reader.array_items()
+            return
+        if first != "{":
+            yield reader.value()
+            return
+
+        reader.pos += 1
+        rest = {}
+        streamed = False
+
+        if reader.peek() == "}":
+            reader.pos += 1
+        else:
+            while True:
+                key = reader.value()
+                reader.expect(":")
+
+                if key == "data" or key in SECTION_KEYS:
+                    streamed = True
+                    if reader.peek() == "[":
+                        yield from reader.array_items()
+                    else:
+                        yield reader.value()
+                else:
+                    rest[key] = reader.value()
+
+                separator = reader.peek()
+                reader.pos += 1
+                if separator == "}":
+                    break
+                if separator != ",":
+                    raise ValueError(
+                        f"Expected ',' or '}}' in JSON object, found {separator!r}"
+                    )
+
+        # An object without item sections is itself a single item.
+        if not streamed:
+            yield rest
+
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,41 @@
+import hashlib
+import json
+import uuid
+
+# Fixed namespace so the same item always maps to the same Qdrant point id.
+ITEM_NAMESPACE = uuid.UUID("5f0c8a6e-3d2b-5c41-9a7e-0d6b1f2e4c93")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def canonical_json(item: dict) -> str:
+    return json.dumps(item, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def item_identity(item: dict) -> str:
+    """Stable identity for a raw data item.
+
+    Items carrying an explicit ``id`` or ``item_id`` keep it across edits,
+    scoped by their ``source`` since ids are only unique within one source.
+    Everything else is identified by a hash of its canonical JSON, so an
+    edited item is treated as a new one replacing the old.
+    """
+    explicit = item.get("item_id") or item.get("id")
+    if explicit:
+        return f"id:{item.get('source', '')}:{explicit}"
+
+    return f"sha256:{content_hash(canonical_json(item))}"
+
+
+def item_point_id(company_id: str, item: dict) -> str:
+    return str(uuid.uuid5(ITEM_NAMESPACE, f"{company_id}:{item_identity(item)}"))
+
+
+def chunk_point_id(parent_id: str, chunk_index: int) -> str:
+    """Point id of one chunk of an item. The first chunk keeps the item's own
+    id, so items short enough for a single chunk keep their existing point."""
+    if chunk_index == 0:
+        return parent_id
+    return str(uuid.uuid5(ITEM_NAMESPACE, f"{parent_id}:chunk:{chunk_index}"))
@@ -0,0 +1,366 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from qdrant_client.models import ScoredPoint, SparseVector
+
+from .sparse import DENSE_VECTOR, SPARSE_VECTOR
+
+# Reciprocal rank fusion constant, matching Qdrant's Fusion.RRF
+RRF_K = 2
+
+
+class LocalIndex:
+    """Exact in-process search over one company's points.
+
+    Dense vectors are a contiguous, L2-normalised float32 matrix, so a query
+    is one matrix-vector product. Hybrid collections also keep their sparse
+    vectors in CSR form and are scored with the same IDF weighting and
+    reciprocal rank fusion Qdrant applies.
+    """
+
+    def __init__(
+        self,
+        ids: List,
+        payloads: List[Dict],
+        vectors: np.ndarray,
+        hybrid: bool,
+        sparse_indptr: Optional[np.ndarray] = None,
+        sparse_indices: Optional[np.ndarray] = None,
+        sparse_values: Optional[np.ndarray] = None,
+        payload_bytes: int = 0,
+    ):
+        self.ids = ids
+        self.payloads = payloads
+        self.vectors = vectors
+        self.hybrid = hybrid
+        # Serialized size of ids and payloads; the in-memory objects are
+        # larger, but this tracks them in proportion for the memory budget
+        self.payload_bytes = payload_bytes
+
+        self.sources = np.array([p.get("source", "") for p in payloads], dtype=object)
+        self.bug_stages = np.array(
+            [p.get("bug_stage", "") for p in payloads], dtype=object
+        )
+        # -1 marks points without an integer sprint; range filters skip them
+        self.sprints = np.array(
+            [
+                p["sprint"] if isinstance(p.get("sprint"), int) else -1
+                for p in payloads
+            ],
+            dtype=np.int64,
+        )
+
+        if hybrid:
+            self.sparse_indices = sparse_indices
+            self.sparse_values = sparse_values
+            self.sparse_rows = np.repeat(
+                np.arange(len(ids)), np.diff(sparse_indptr)
+            ).astype(np.int64)
+            terms, doc_freq = np.unique(sparse_indices, return_counts=True)
+            self.terms = terms
+            n = len(ids)
+            self.idf = np.log((n - doc_freq + 0.5) / (doc_freq + 0.5) + 1).astype(
+                np.float32
+            )
+
+    @property
+    def nbytes(self) -> int:
+        size = self.vectors.nbytes + self.payload_bytes
+        if self.hybrid:
+            size += self.sparse_indices.nbytes + self.sparse_values.nbytes
+            size += self.sparse_rows.nbytes
+        return size
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def mask(self, filters) -> Optional[np.ndarray]:
+        if filters is None:
+            return None
+
+        mask = np.ones(len(self.ids), dtype=bool)
+        if filters.sources:
+            mask &= np.isin(self.sources, filters.sources)
+        if filters.sprint_from is not None:
+            mask &= self.sprints >= filters.sprint_from
+        if filters.sprint_to is not None:
+            mask &= self.sprints <= filters.sprint_to
+        if filters.sprint_from is not None or filters.sprint_to is not None:
+            mask &= self.sprints >= 0
+        if filters.bug_stages:
+            mask &= np.isin(self.bug_stages, filters.bug_stages)
+        return mask
+
+    def dense_scores(self, query_embedding: List[float]) -> np.ndarray:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        return self.vectors @ query
+
+    def sparse_scores(self, query: SparseVector) -> np.ndarray:
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        if len(self.terms) == 0 or not query.indices:
+            return scores
+
+        order = np.argsort(query.indices)
+        query_terms = np.asarray(query.indices, dtype=self.terms.dtype)[order]
+        query_values = np.asarray(query.values, dtype=np.float32)[order]
+
+        positions = np.searchsorted(self.terms, query_terms)
+        positions = positions.clip(max=len(self.terms) - 1)
+        found = self.terms[positions] == query_terms
+        weights = np.where(found, self.idf[positions], 0) * query_values
+
+        hits = np.isin(self.sparse_indices, query_terms[found])
+        slots = np.searchsorted(query_terms, self.sparse_indices[hits])
+        np.add.at(
+            scores, self.sparse_rows[hits], self.sparse_values[hits] * weights[slots]
+        )
+        return scores
+
+    @staticmethod
+    def top(scores: np.ndarray, candidates: np.ndarray, limit: int) -> np.ndarray:
+        """Indices into ``candidates`` of the ``limit`` best scores, best first."""
+        if len(candidates) > limit:
+            part = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            candidates = candidates[part]
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    def search(
+        self,
+        query_embedding: List[float],
+        limit: int,
+        filters=None,
+        sparse_query: Optional[SparseVector] = None,
+        prefetch_limit: Optional[int] = None,
+        with_vectors: bool = False,
+    ) -> List[ScoredPoint]:
+        mask = self.mask(filters)
+        candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(self))
+        if len(candidates) == 0 or limit <= 0:
+            return []
+
+        dense = self.dense_scores(query_embedding)
+        if not self.hybrid or sparse_query is None:
+            order = self.top(dense, candidates, limit)
+            scores = dense[order]
+        else:
+            prefetch_limit = prefetch_limit or limit
+            fused: Dict[int, float] = {}
+            sparse = self.sparse_scores(sparse_query)
+            ranked = [
+                self.top(dense, candidates, prefetch_limit),
+                self.top(sparse, candidates[sparse[candidates] > 0], prefetch_limit),
+            ]
+            for ranking in ranked:
+                for rank, row in enumerate(ranking.tolist()):
+                    fused[row] = fused.get(row, 0.0) + 1 / (RRF_K + rank)
+
+            best = sorted(fused.items(), key=lambda item: -item[1])[:limit]
+            order = np.array([row for row, _ in best], dtype=np.int64)
+            scores = np.array([score for _, score in best], dtype=np.float32)
+
+        results = []
+        for row, score in zip(order.tolist(), scores.tolist()):
+            vector = None
+            if with_vectors:
+                dense_vector = self.vectors[row].tolist()
+                vector = {DENSE_VECTOR: dense_vector} if self.hybrid else dense_vector
+            results.append(
+                ScoredPoint(
+                    id=self.ids[row],
+                    version=0,
+                    score=score,
+                    payload=self.payloads[row],
+                    vector=vector,
+                )
+            )
+        return results
+
+
+class LocalIndexManager:
+    """Keeps small companies' vectors in process, snapshotted to disk.
+
+    Collections with at most ``max_points`` points are served from a
+    memory-mapped snapshot under ``path``, keyed by the collection's ingest
+    generation so a re-ingest is picked up as a new snapshot. Resident
+    indexes are evicted least recently used once they exceed
+    ``memory_budget_mb``.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_points: Optional[int] = None,
+        memory_budget_mb: Optional[float] = None,
+    ):
+        self.path = path or os.getenv("LOCAL_INDEX_PATH", ".cache/donna/local_index")
+        self.max_points = (
+            max_points
+            if max_points is not None
+            else int(os.getenv("LOCAL_INDEX_MAX_POINTS", "5000"))
+        )
+        self.memory_budget = (
+            memory_budget_mb
+            if memory_budget_mb is not None
+            else float(os.getenv("LOCAL_INDEX_MEMORY_MB", "256"))
+        ) * 1024 * 1024
+
+        self.resident: "OrderedDict[str, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+        # Per-company build locks, so concurrent cold searches build once
+        self.build_locks: Dict[str, threading.Lock] = {}
+        self.async_build_locks: Dict[str, asyncio.Lock] = {}
+        self.hits = 0
+        self.loads = 0
+        self.builds = 0
+
+    def eligible(self, points_count: Optional[int], generation: Optional[str]) -> bool:
+        if not generation or points_count is None:
+            return False
+        return 0 < points_count <= self.max_points
+
+    def _snapshot_dir(self, company_id: str, generation: str) -> str:
+        return os.path.join(self.path, company_id, generation)
+
+    def build_lock(self, company_id: str) -> threading.Lock:
+        with self.lock:
+            return self.build_locks.setdefault(company_id, threading.Lock())
+
+    def async_build_lock(self, company_id: str) -> asyncio.Lock:
+        with self.lock:
+            return self.async_build_locks.setdefault(company_id, asyncio.Lock())
+
+    def resident_index(self, company_id: str, generation: str) -> Optional[LocalIndex]:
+        """The in-memory index for ``generation``; never touches disk."""
+        with self.lock:
+            entry = self.resident.get(company_id)
+            if entry is not None and entry[0] == generation:
+                self.resident.move_to_end(company_id)
+                self.hits += 1
+                return entry[1]
+        return None
+
+    def lookup(self, company_id: str, generation: str) -> Optional[LocalIndex]:
+        """Resident index or on-disk snapshot for ``generation``, if any."""
+        index = self.resident_index(company_id, generation)
+        if index is not None:
+            return index
+
+        directory = self._snapshot_dir(company_id, generation)
+        if not os.path.exists(os.path.join(directory, "meta.json")):
+            return None
+
+        index = self._load(directory)
+        self.loads += 1
+        self._keep(company_id, generation, index)
+        return index
+
+    def build(
+        self, company_id: str, generation: str, hybrid: bool, records: Iterable
+    ) -> LocalIndex:
+        """Snapshot scrolled Qdrant ``records`` (with vectors) and load them."""
+        ids, payloads, dense = [], [], []
+        indptr, indices, values = [0], [], []
+        for record in records:
+            vector = record.vector
+            ids.append(record.id)
+            payloads.append(record.payload or {})
+            dense.append(vector[DENSE_VECTOR] if isinstance(vector, dict) else vector)
+            if hybrid:
+                sparse = vector.get(SPARSE_VECTOR) if isinstance(vector, dict) else None
+                if sparse is not None:
+                    indices.extend(sparse.indices)
+                    values.extend(sparse.values)
+                indptr.append(len(indices))
+
+        matrix = np.asarray(dense, dtype=np.float32).reshape(len(ids), -1)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-12)
+
+        company_dir = os.path.join(self.path, company_id)
+        directory = self._snapshot_dir(company_id, generation)
+        os.makedirs(company_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f"{generation}.tmp-", dir=company_dir)
+
+        arrays = {"vectors": matrix}
+        if hybrid:
+            arrays["sparse_indptr"] = np.asarray(indptr, dtype=np.int64)
+            arrays["sparse_indices"] = np.asarray(indices, dtype=np.uint32)
+            arrays["sparse_values"] = np.asarray(values, dtype=np.float32)
+        for name, values_array in arrays.items():
+            np.save(os.path.join(staging, f"{name}.npy"), values_array)
+
+        meta = {"ids": ids, "payloads": payloads, "hybrid": hybrid}
+        with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, default=str)
+
+        try:
+            os.rename(staging, directory)
+        except OSError:
+            # Another process published this generation first; theirs is
+            # identical, so use it rather than replacing it under its readers
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.exists(os.path.join(directory, "meta.json")):
+                raise
+
+        # Older generations are stale once this one is in place
+        for name in os.listdir(company_dir):
+            if name != generation and ".tmp-" not in name:
+                shutil.rmtree(os.path.join(company_dir, name), ignore_errors=True)
+
+        index = self._load(directory)
+        self.builds += 1
+        self._keep(company_id, generation, index)
+        return index
+
+    def _load(self, directory: str) -> LocalIndex:
+        meta_path = os.path.join(directory, "meta.json")
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+
+        def array(name):
+            return np.load(os.path.join(directory, name), mmap_mode="r")
+
+        hybrid = meta["hybrid"]
+        return LocalIndex(
+            meta["ids"],
+            meta["payloads"],
+            array("vectors.npy"),
+            hybrid,
+            array("sparse_indptr.npy") if hybrid else None,
+            array("sparse_indices.npy") if hybrid else None,
+            array("sparse_values.npy") if hybrid else None,
+            payload_bytes=os.path.getsize(meta_path),
+        )
+
+    def _keep(self, company_id: str, generation: str, index: LocalIndex):
+        with self.lock:
+            self.resident[company_id] = (generation, index)
+            self.resident.move_to_end(company_id)
+
+            used = sum(entry[1].nbytes for entry in self.resident.values())
+            while used > self.memory_budget and len(self.resident) > 1:
+                _, (_, evicted) = self.resident.popitem(last=False)
+                used -= evicted.nbytes
+
+    def invalidate_company(self, company_id: str):
+        with self.lock:
+            self.resident.pop(company_id, None)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                "resident": len(self.resident),
+                "resident_bytes": sum(e[1].nbytes for e in self.resident.values()),
+                "memory_budget_bytes": int(self.memory_budget),
+                "max_points": self.max_points,
+                "hits": self.hits,
+                "loads": self.loads,
+                "builds": self.builds,
+            }
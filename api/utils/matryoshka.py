@@ -0,0 +1,21 @@
+import math
+from typing import List, Sequence
+
+# Named vector holding the truncated embedding in collections created with
+# Matryoshka dimensions; the full embedding stays in the "dense" vector.
+MRL_VECTOR = "dense_mrl"
+
+
+def truncate(vector: Sequence[float], dims: int) -> List[float]:
+    """First ``dims`` components of a Matryoshka embedding, renormalised to
+    unit length so cosine scores stay comparable."""
+    head = list(vector[:dims])
+    norm = math.sqrt(sum(x * x for x in head)) or 1.0
+    return [x / norm for x in head]
+
+
+def collection_mrl_dims(collection_info) -> int:
+    vectors = collection_info.config.params.vectors
+    if isinstance(vectors, dict) and MRL_VECTOR in vectors:
+        return vectors[MRL_VECTOR].size
+    return 0
@@ -0,0 +1,95 @@
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .chunker import count_tokens
+
+# Insight lists, in the order the prompt presents them, with their headings
+INSIGHT_SECTIONS = [
+    ("warnings", "Past warnings"),
+    ("lessons_learned", "Lessons learned"),
+    ("common_mistakes", "Common mistakes to avoid"),
+    ("bug_clues", "Bug-related insights"),
+]
+
+# Order in which sections claim the token budget; warnings and mistakes are
+# short and the most direct answer to "what should I watch out for"
+PRIORITY = ["warnings", "common_mistakes", "context", "lessons_learned", "bug_clues"]
+
+_NON_WORD = re.compile(r"\W+")
+
+
+class PromptBudget:
+    """Chooses what retrieved context goes into a prompt.
+
+    Results whose cosine similarity to the query is below ``min_score`` are
+    dropped, overlapping insight strings are merged, and the remaining entries fill
+    ``max_tokens`` section by section in ``PRIORITY`` order, with at most
+    ``section_limit`` entries per insight section.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        min_score: Optional[float] = None,
+        section_limit: int = 5,
+    ):
+        self.max_tokens = (
+            max_tokens
+            if max_tokens is not None
+            else int(os.getenv("PROMPT_MAX_TOKENS", "3000"))
+        )
+        self.min_score = (
+            min_score
+            if min_score is not None
+            else float(os.getenv("PROMPT_MIN_SCORE", "0.3"))
+        )
+        self.section_limit = section_limit
+
+    def relevant(self, results) -> List:
+        """``results`` at least ``min_score`` similar to the query. The cut
+        uses the dense cosine similarity the retriever records on each hit,
+        since fused hybrid scores only say how hits rank; a hit without one
+        is kept."""
+        kept = []
+        for result in results:
+            similarity = (result.payload or {}).get("similarity")
+            if similarity is None or similarity >= self.min_score:
+                kept.append(result)
+        return kept
+
+    @staticmethod
+    def dedupe(entries: Sequence) -> List[str]:
+        """Drop entries that repeat, or are contained in, an earlier one;
+        a later entry containing an earlier one replaces it."""
+        kept: List[Tuple[str, str]] = []
+        for entry in entries:
+            text = str(entry).strip()
+            key = _NON_WORD.sub(" ", text.lower()).strip()
+            if not key:
+                continue
+            if any(key in other for _, other in kept):
+                continue
+            kept = [(t, k) for t, k in kept if k not in key]
+            kept.append((text, key))
+        return [text for text, _ in kept]
+
+    def fill(self, fixed_tokens: int, sections: Dict[str, List[str]]) -> Dict:
+        """Entries of each section that fit in the budget left after
+        ``fixed_tokens``; an entry too large to fit is skipped so smaller
+        ones after it still can."""
+        headings = dict(INSIGHT_SECTIONS)
+        remaining = self.max_tokens - fixed_tokens
+        chosen: Dict[str, List[str]] = {name: [] for name in sections}
+        for name in PRIORITY:
+            for entry in sections.get(name, []):
+                if name in headings and len(chosen[name]) >= self.section_limit:
+                    break
+                # Bullet and line break, plus the heading for the first entry
+                cost = count_tokens(entry) + 2
+                if name in headings and not chosen[name]:
+                    cost += count_tokens(headings[name]) + 2
+                if cost <= remaining:
+                    chosen[name].append(entry)
+                    remaining -= cost
+        return chosen
@@ -0,0 +1,127 @@
+import argparse
+import uuid
+from typing import Dict, List, Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Disabled,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParamsDiff,
+)
+
+from .resources import ResourceSettings
+from .sparse import DENSE_VECTOR
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+# Candidates fetched per result from the quantized vectors before the
+# full-precision rescore; binary codes lose more and need a wider net.
+DEFAULT_OVERSAMPLING = {"int8": 2.0, "binary": 3.0}
+
+
+def quantization_config(mode: Optional[str]):
+    """Qdrant quantization config for ``mode``; the quantized vectors stay in
+    RAM while the originals used for rescoring move to disk."""
+    if mode == "int8":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8, quantile=0.99, always_ram=True
+            )
+        )
+    if mode == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    if mode in (None, "", "none"):
+        return None
+    raise ValueError(f"Unknown quantization mode: {mode}")
+
+
+def quantization_mode(collection_info) -> str:
+    config = collection_info.config.quantization_config
+    vectors = collection_info.config.params.vectors
+    if config is None and isinstance(vectors, dict) and DENSE_VECTOR in vectors:
+        config = vectors[DENSE_VECTOR].quantization_config
+
+    if isinstance(config, ScalarQuantization):
+        return "int8"
+    if isinstance(config, BinaryQuantization):
+        return "binary"
+    return "none"
+
+
+def search_params(
+    mode: str, oversampling: Optional[float] = None
+) -> Optional[SearchParams]:
+    if mode not in DEFAULT_OVERSAMPLING:
+        return None
+    return SearchParams(
+        quantization=QuantizationSearchParams(
+            rescore=True,
+            oversampling=oversampling or DEFAULT_OVERSAMPLING[mode],
+        )
+    )
+
+
+def quantize_collection(client: QdrantClient, collection_name: str, mode: str):
+    """Switch an existing collection to ``mode`` in place. Qdrant rebuilds
+    the quantized data in the background; searches keep working meanwhile."""
+    info = client.get_collection(collection_name)
+    vectors = info.config.params.vectors
+    vector_name = DENSE_VECTOR if isinstance(vectors, dict) else ""
+    quantized = mode != "none"
+
+    client.update_collection(
+        collection_name=collection_name,
+        vectors_config={vector_name: VectorParamsDiff(on_disk=quantized)},
+        quantization_config=quantization_config(mode) or Disabled.DISABLED,
+        # Same tag the ingestor bumps; in-process indexes re-snapshot on it
+        metadata={"generation": uuid.uuid4().hex},
+    )
+
+
+def quantize_companies(
+    client: QdrantClient, mode: str, companies: Optional[List[str]] = None
+) -> Dict[str, str]:
+    names = [
+        c.name
+        for c in client.get_collections().collections
+        if c.name.startswith("company_")
+    ]
+    if companies:
+        names = [n for n in names if n.replace("company_", "", 1) in companies]
+
+    results = {}
+    for name in sorted(names):
+        try:
+            quantize_collection(client, name, mode)
+            results[name] = mode
+            print(f"{name}: {mode}")
+        except Exception as e:
+            results[name] = f"error: {e}"
+            print(f"{name} failed: {e}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert company collections to quantized vectors in place"
+    )
+    parser.add_argument("mode", choices=QUANTIZATION_MODES)
+    parser.add_argument(
+        "--company",
+        action="append",
+        help="company id to convert (repeatable); defaults to all companies",
+    )
+    args = parser.parse_args()
+
+    settings = ResourceSettings()
+    client = QdrantClient(url=settings.qdrant_url, timeout=settings.qdrant_timeout)
+    results = quantize_companies(client, args.mode, args.company)
+    client.close()
+    if any(r.startswith("error") for r in results.values()):
+        raise SystemExit(1)
@@ -0,0 +1,49 @@
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+def mmr_select(
+    query_vector: Sequence[float],
+    candidate_vectors: Sequence[Sequence[float]],
+    k: int,
+    diversity: float,
+    relevance: Optional[Sequence[float]] = None,
+) -> List[int]:
+    """Pick ``k`` candidate indices by maximal marginal relevance.
+
+    Each step takes the candidate maximising
+    ``(1 - diversity) * sim(query, c) - diversity * max sim(c, selected)``,
+    with cosine similarities computed once as one matrix product.
+    ``diversity`` 0 keeps the pure relevance order; 1 ignores relevance
+    after the first pick. ``relevance`` overrides the query cosine, e.g. with
+    fused hybrid scores scaled to [0, 1].
+    """
+    vectors = np.asarray(candidate_vectors, dtype=np.float32)
+    if len(vectors) == 0 or k <= 0:
+        return []
+
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+    if relevance is None:
+        query = np.asarray(query_vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        relevance = vectors @ query
+    else:
+        relevance = np.asarray(relevance, dtype=np.float32)
+
+    similarity = vectors @ vectors.T
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = similarity[selected[0]].copy()
+    available = np.ones(len(vectors), dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < min(k, len(vectors)):
+        scores = (1 - diversity) * relevance - diversity * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+
+    return selected
@@ -0,0 +1,120 @@
+import asyncio
+import os
+from typing import Optional
+
+import ollama
+from google import genai
+from google.genai import types
+from pymongo import AsyncMongoClient, MongoClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+from .answer_cache import SemanticAnswerCache
+from .cache import SearchCache
+from .company_metadata import AsyncChatHistory
+from .embedding_cache import EmbeddingCache
+from .history_writer import HistoryWriter
+from .local_index import LocalIndexManager
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+class ResourceSettings:
+    """Connection settings for the shared clients, read from the environment."""
+
+    def __init__(self):
+        self.mongo_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
+        self.mongo_max_pool_size = _env_int("MONGODB_MAX_POOL_SIZE", 100)
+        self.mongo_min_pool_size = _env_int("MONGODB_MIN_POOL_SIZE", 0)
+        self.mongo_timeout_ms = _env_int("MONGODB_TIMEOUT_MS", 5000)
+
+        self.qdrant_url = os.getenv(
+            "QDRANT_URL",
+            f"http://{os.getenv('QDRANT_HOST', 'localhost')}:{os.getenv('QDRANT_PORT', '6333')}",
+        )
+        self.qdrant_pool_size = _env_int("QDRANT_POOL_SIZE", 50)
+        self.qdrant_timeout = _env_int("QDRANT_TIMEOUT", 10)
+        self.quantization = os.getenv("QDRANT_QUANTIZATION", "none").lower()
+        self.oversampling = _env_float("QDRANT_OVERSAMPLING", 0.0) or None
+        self.mrl_dims = _env_int("MRL_DIMS", 0)
+        self.slim_payloads = os.getenv("QDRANT_SLIM_PAYLOADS", "").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+
+        self.ollama_host = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+        self.ollama_timeout = _env_float("OLLAMA_TIMEOUT", 60.0)
+        self.embed_batch_size = _env_int("EMBED_BATCH_SIZE", 64)
+        self.embed_concurrency = _env_int("EMBED_CONCURRENCY", 4)
+
+        self.google_api_key = os.getenv("GOOGLE_API_KEY")
+        self.genai_timeout_ms = _env_int("GENAI_TIMEOUT_MS", 120000)
+        self.genai_concurrency = _env_int("GENAI_CONCURRENCY", 8)
+        self.batch_max_tasks = _env_int("BATCH_MAX_TASKS", 100)
+
+
+class Resources:
+    """Clients shared by every request handled in one worker process.
+
+    Created once from the FastAPI lifespan and handed to the utility classes,
+    so requests reuse the same connection pools instead of opening new ones.
+    The async clients back the request path; the sync ones serve the handlers
+    and helpers that have not moved off blocking drivers.
+    """
+
+    def __init__(self, settings: Optional[ResourceSettings] = None):
+        self.settings = settings or ResourceSettings()
+        s = self.settings
+
+        mongo_options = dict(
+            maxPoolSize=s.mongo_max_pool_size,
+            minPoolSize=s.mongo_min_pool_size,
+            serverSelectionTimeoutMS=s.mongo_timeout_ms,
+            connectTimeoutMS=s.mongo_timeout_ms,
+        )
+        self.mongo = MongoClient(s.mongo_uri, **mongo_options)
+        self.async_mongo = AsyncMongoClient(s.mongo_uri, **mongo_options)
+
+        self.qdrant = QdrantClient(
+            url=s.qdrant_url, timeout=s.qdrant_timeout, pool_size=s.qdrant_pool_size
+        )
+        self.async_qdrant = AsyncQdrantClient(
+            url=s.qdrant_url, timeout=s.qdrant_timeout, pool_size=s.qdrant_pool_size
+        )
+
+        self.ollama = ollama.Client(host=s.ollama_host, timeout=s.ollama_timeout)
+        self.async_ollama = ollama.AsyncClient(
+            host=s.ollama_host, timeout=s.ollama_timeout
+        )
+        self.embedding_cache = EmbeddingCache()
+        self.search_cache = SearchCache()
+        self.answer_cache = SemanticAnswerCache()
+        self.local_indexes = LocalIndexManager()
+        self.genai = (
+            genai.Client(
+                api_key=s.google_api_key,
+                http_options=types.HttpOptions(timeout=s.genai_timeout_ms),
+            )
+            if s.google_api_key
+            else None
+        )
+        # Caps concurrent Gemini generations started by batch queries
+        self.genai_semaphore = asyncio.Semaphore(s.genai_concurrency)
+        # Persists streamed replies after the stream; started by the lifespan
+        self.history_writer = HistoryWriter(AsyncChatHistory(self.async_mongo))
+
+    async def aclose(self):
+        await self.history_writer.close()
+        self.mongo.close()
+        self.qdrant.close()
+        await self.async_mongo.close()
+        await self.async_qdrant.close()
+        self.embedding_cache.close()
@@ -1,26 +1,354 @@
+import asyncio
+import numpy as np
 import ollama
-from qdrant_client import QdrantClient
-from typing import List, Dict
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import (
+    FieldCondition,
+    Filter,
+    Fusion,
+    FusionQuery,
+    MatchAny,
+    MatchValue,
+    Prefetch,
+    QueryRequest,
+    Range,
+)
+from typing import List, Dict, Optional
+
+from .cache import SearchCache
+from .company_metadata import AsyncCompanyDataStore, CompanyDataStore
+from .embedding_cache import EmbeddingCache
+from .local_index import LocalIndex, LocalIndexManager
+from .matryoshka import MRL_VECTOR, collection_mrl_dims, truncate
+from .quantize import quantization_mode, search_params
+from .rerank import mmr_select
+from .sparse import DENSE_VECTOR, SPARSE_VECTOR, SparseEncoder, is_hybrid
+
+# Item fields build_context reads, fetched when hydrating slim points
+CONTEXT_FIELDS = [
+    "content",
+    "chunks",
+    "data.warnings",
+    "data.lessons_learned",
+    "data.best_practices",
+    "data.common_mistakes",
+    "data.bug_clues",
+    "data.bug_related",
+    "data.bug_connection",
+    "data.bug_mentions",
+    "data.key_decisions",
+]
+
+
+class SearchFilters:
+    """Payload constraints applied together with the vector query, e.g. only
+    Jira tickets from sprints 4-6. Every field is optional."""
+
+    def __init__(
+        self,
+        sources: Optional[List[str]] = None,
+        sprint_from: Optional[int] = None,
+        sprint_to: Optional[int] = None,
+        bug_stages: Optional[List[str]] = None,
+    ):
+        self.sources = sorted(set(sources)) if sources else None
+        self.sprint_from = sprint_from
+        self.sprint_to = sprint_to
+        self.bug_stages = sorted(set(bug_stages)) if bug_stages else None
+
+    def key(self) -> tuple:
+        return (
+            tuple(self.sources or ()),
+            self.sprint_from,
+            self.sprint_to,
+            tuple(self.bug_stages or ()),
+        )
+
+    def to_filter(self) -> Optional[Filter]:
+        conditions = []
+        if self.sources:
+            conditions.append(
+                FieldCondition(key="source", match=MatchAny(any=self.sources))
+            )
+        if self.sprint_from is not None or self.sprint_to is not None:
+            conditions.append(
+                FieldCondition(
+                    key="sprint", range=Range(gte=self.sprint_from, lte=self.sprint_to)
+                )
+            )
+        if self.bug_stages:
+            conditions.append(
+                FieldCondition(key="bug_stage", match=MatchAny(any=self.bug_stages))
+            )
+        return Filter(must=conditions) if conditions else None
+
+
+class BaseRetriever:
+    embedding_model = "nomic-embed-text"
+    sparse_encoder = SparseEncoder()
+    # Candidates taken from each of the dense and sparse lists before fusion
+    prefetch_factor = 4
+    # Candidates fetched per requested result when re-ranking for diversity
+    mmr_fetch_factor = 4
+    # Truncated-vector shortlist size per candidate re-ranked at full size
+    mrl_shortlist_factor = 4
+    # Candidates fetched per requested result so that, after collapsing
+    # chunks to their item, enough distinct items remain
+    chunk_fetch_factor = 2
+
+    def query_args(
+        self,
+        state: Dict,
+        query: str,
+        query_embedding: List[float],
+        limit: int,
+        filters: Optional[SearchFilters] = None,
+    ) -> Dict:
+        """``query_points`` arguments for a collection described by ``state``:
+        dense-only for legacy collections, otherwise dense and sparse
+        candidates fused by reciprocal rank. Quantized dense vectors are
+        searched with oversampling and rescored against the originals; with
+        a Matryoshka vector the truncated embedding shortlists candidates
+        that the full one re-ranks."""
+        query_filter = filters.to_filter() if filters else None
+        params = search_params(state["quantization"], self.oversampling)
+        if not state["hybrid"]:
+            return {
+                "query": query_embedding,
+                "query_filter": query_filter,
+                "search_params": params,
+                "limit": limit,
+            }
+
+        candidates = limit * self.prefetch_factor
+        if state["mrl_dims"]:
+            dense = Prefetch(
+                prefetch=Prefetch(
+                    query=truncate(query_embedding, state["mrl_dims"]),
+                    using=MRL_VECTOR,
+                    filter=query_filter,
+                    params=params,
+                    limit=candidates * self.mrl_shortlist_factor,
+                ),
+                query=query_embedding,
+                using=DENSE_VECTOR,
+                limit=candidates,
+            )
+        else:
+            dense = Prefetch(
+                query=query_embedding,
+                using=DENSE_VECTOR,
+                filter=query_filter,
+                params=params,
+                limit=candidates,
+            )
 
+        return {
+            "prefetch": [
+                dense,
+                Prefetch(
+                    query=self.sparse_encoder.encode_query(query),
+                    using=SPARSE_VECTOR,
+                    filter=query_filter,
+                    limit=candidates,
+                ),
+            ],
+            "query": FusionQuery(fusion=Fusion.RRF),
+            "limit": limit,
+        }
 
-class DataRetriever:
-    def __init__(self):
-        self.client = QdrantClient("http://localhost:6333")
-        self.embedding_model = "nomic-embed-text"
-
-    def embed(self, text: str):
-        result = ollama.embeddings(model=self.embedding_model, prompt=text)
-        return result["embedding"]
+    @staticmethod
+    def describe_collection(info) -> Dict:
+        return {
+            "hybrid": is_hybrid(info),
+            "points": info.points_count,
+            "generation": (info.config.metadata or {}).get("generation"),
+            "quantization": quantization_mode(info),
+            "mrl_dims": collection_mrl_dims(info),
+        }
 
-    def search(self, company_id: str, query: str, limit: int = 10):
-        collection_name = f"company_{company_id}"
-        query_embedding = self.embed(query)
+    def local_search(
+        self,
+        index: LocalIndex,
+        query: str,
+        query_embedding: List[float],
+        fetch: Dict,
+        filters: Optional[SearchFilters] = None,
+    ) -> List:
+        return index.search(
+            query_embedding,
+            fetch["limit"],
+            filters,
+            self.sparse_encoder.encode_query(query) if index.hybrid else None,
+            fetch["limit"] * self.prefetch_factor,
+            with_vectors=bool(fetch["with_vectors"]),
+        )
+
+    def fetch_args(self, hybrid: bool, limit: int, diversity: float) -> Dict:
+        """How many points to fetch and whether to return their dense
+        vectors. The diversity re-rank needs them, and hybrid hits need them
+        for their cosine similarity, which fused scores do not carry."""
+        if not 0 <= diversity <= 1:
+            raise ValueError("diversity must be between 0 and 1")
+        limit *= self.chunk_fetch_factor
+        if hybrid:
+            with_vectors = [DENSE_VECTOR]
+        else:
+            with_vectors = bool(diversity)
+        if diversity:
+            limit *= self.mmr_fetch_factor
+        return {"limit": limit, "with_vectors": with_vectors}
+
+    @staticmethod
+    def collapse(results) -> List:
+        """Keep only the best-ranked chunk of each item, in order."""
+        seen = set()
+        collapsed = []
+        for result in results:
+            payload = result.payload or {}
+            parent = payload.get("parent_id") or payload.get("item_id") or result.id
+            if parent not in seen:
+                seen.add(parent)
+                collapsed.append(result)
+        return collapsed
+
+    def diversify(
+        self,
+        results,
+        query_embedding: List[float],
+        limit: int,
+        diversity: float,
+        hybrid: bool,
+    ) -> List:
+        """Re-rank over-fetched ``results`` to a diverse top ``limit`` by
+        maximal marginal relevance."""
+        if not results:
+            return results
+
+        vectors = [
+            r.vector[DENSE_VECTOR] if isinstance(r.vector, dict) else r.vector
+            for r in results
+        ]
+        relevance = None
+        if hybrid:
+            # Fused scores keep the sparse matches' weight; scale to [0, 1]
+            top = max(r.score for r in results) or 1.0
+            relevance = [r.score / top for r in results]
+        order = mmr_select(query_embedding, vectors, limit, diversity, relevance)
+        return [results[i] for i in order]
+
+    @staticmethod
+    def with_similarity(results, query_embedding: List[float], hybrid: bool) -> List:
+        """Copies of ``results`` without their vectors, each recording its
+        dense cosine similarity to the query as ``payload["similarity"]``.
+        Unlike fused hybrid scores it is comparable between queries and
+        collections; dense-only scores already are that similarity."""
+        similarities = [result.score for result in results]
+        if hybrid and results:
+            vectors = np.asarray(
+                [result.vector[DENSE_VECTOR] for result in results], dtype=np.float32
+            )
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+            query = np.asarray(query_embedding, dtype=np.float32)
+            query /= max(float(np.linalg.norm(query)), 1e-12)
+            similarities = (vectors @ query).tolist()
+
+        return [
+            result.model_copy(
+                update={
+                    "payload": {**(result.payload or {}), "similarity": similarity},
+                    "vector": None,
+                }
+            )
+            for result, similarity in zip(results, similarities)
+        ]
 
-        results = self.client.query_points(
-            collection_name=collection_name, query=query_embedding, limit=limit
-        ).points
+    def finish_search(
+        self,
+        results,
+        query_embedding: List[float],
+        limit: int,
+        diversity: float,
+        hybrid: bool,
+    ) -> List:
+        """Collapse over-fetched hits to their items and cut them to
+        ``limit``, diversifying first if asked to."""
+        results = self.collapse(results)
+        if diversity:
+            results = self.diversify(
+                results, query_embedding, limit, diversity, hybrid
+            )
+        else:
+            results = results[:limit]
+        return self.with_similarity(results, query_embedding, hybrid)
+
+    @staticmethod
+    def batch_request(args: Dict, with_vectors) -> QueryRequest:
+        """``query_args`` as one request of a ``query_batch_points`` call."""
+        return QueryRequest(
+            prefetch=args.get("prefetch"),
+            query=args["query"],
+            filter=args.get("query_filter"),
+            params=args.get("search_params"),
+            limit=args["limit"],
+            with_vector=with_vectors,
+            with_payload=True,
+        )
+
+    def slim_item_ids(self, results) -> List[str]:
+        """Item ids of points stored without their content."""
+        return [
+            result.payload["item_id"]
+            for result in results
+            if "full_data" not in result.payload
+            and "content" not in result.payload
+            and result.payload.get("item_id")
+        ]
 
-        return results
+    def parent_ids(self, results) -> List[str]:
+        """Parents of chunks stored with their text but not the item itself,
+        which only an item's first chunk carries."""
+        return list(
+            dict.fromkeys(
+                result.payload["parent_id"]
+                for result in results
+                if "full_data" not in result.payload
+                and "content" in result.payload
+                and result.payload.get("parent_id")
+            )
+        )
+
+    def merge_parents(self, results, parents: Dict[str, Dict]) -> List:
+        """Copies of ``results`` with ``full_data`` taken from ``parents``."""
+        merged = []
+        for result in results:
+            data = parents.get(result.payload.get("parent_id"))
+            if data is not None and "full_data" not in result.payload:
+                payload = {**result.payload, "full_data": data}
+                result = result.model_copy(update={"payload": payload})
+            merged.append(result)
+        return merged
+
+    def merge_items(self, results, items: Dict[str, Dict]) -> List:
+        """Copies of ``results`` with slim payloads filled in from ``items``;
+        the originals are left untouched since they may be cached."""
+        merged = []
+        for result in results:
+            doc = items.get(result.payload.get("item_id"))
+            if doc is not None and "full_data" not in result.payload:
+                content = doc.get("content", "")
+                chunks = doc.get("chunks") or []
+                index = result.payload.get("chunk_index", 0)
+                if index < len(chunks):
+                    content = chunks[index]
+                payload = {
+                    **result.payload,
+                    "content": content,
+                    "full_data": doc.get("data", {}),
+                }
+                result = result.model_copy(update={"payload": payload})
+            merged.append(result)
+        return merged
 
     def format_results(self, results) -> str:
         contexts = []
@@ -42,9 +370,7 @@ class DataRetriever:
 
         return "\n\n".join(contexts)
 
-    def get_context(self, company_id: str, query: str, limit: int = 10) -> Dict:
-        results = self.search(company_id, query, limit)
-
+    def build_context(self, results) -> Dict:
         warnings = []
         lessons = []
         best_practices = []
@@ -101,10 +427,166 @@ class DataRetriever:
             "raw_results": results,
         }
 
-    def get_sprint_context(self, company_id: str, sprint: int, limit: int = 20) -> Dict:
+
+class DataRetriever(BaseRetriever):
+    def __init__(
+        self,
+        client: Optional[QdrantClient] = None,
+        embedder: Optional[ollama.Client] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        search_cache: Optional[SearchCache] = None,
+        data_store: Optional[CompanyDataStore] = None,
+        local_indexes: Optional[LocalIndexManager] = None,
+        oversampling: Optional[float] = None,
+    ):
+        self.client = client or QdrantClient("http://localhost:6333")
+        self.embedder = embedder or ollama.Client()
+        self.embedding_cache = embedding_cache or EmbeddingCache()
+        self.search_cache = search_cache or SearchCache()
+        self.data_store = data_store or CompanyDataStore()
+        # Small collections are searched in process when this is set
+        self.local_indexes = local_indexes
+        # Quantized search oversampling; None uses the per-mode default
+        self.oversampling = oversampling
+
+    def embed(self, text: str):
+        key = self.search_cache.normalize(text)
+        embedding = self.search_cache.embeddings.get(key)
+        if embedding is not None:
+            return embedding
+
+        # Queries read the ingest-side disk cache but are not written back to
+        # it, so one-off query text cannot evict item embeddings; repeats are
+        # served by the in-memory search cache.
+        embedding = self.embedding_cache.get(self.embedding_model, text)
+        if embedding is None:
+            result = self.embedder.embed(model=self.embedding_model, input=text)
+            embedding = result["embeddings"][0]
+
+        self.search_cache.embeddings.set(key, embedding)
+        return embedding
+
+    def collection_state(self, company_id: str) -> Dict:
+        state = self.search_cache.collections.get(company_id)
+        if state is None:
+            info = self.client.get_collection(f"company_{company_id}")
+            state = self.describe_collection(info)
+            self.search_cache.collections.set(company_id, state)
+        return state
+
+    def local_index(self, company_id: str, state: Dict) -> Optional[LocalIndex]:
+        manager = self.local_indexes
+        if manager is None:
+            return None
+        if not manager.eligible(state["points"], state["generation"]):
+            return None
+
+        index = manager.resident_index(company_id, state["generation"])
+        if index is not None:
+            return index
+
+        with manager.build_lock(company_id):
+            index = manager.lookup(company_id, state["generation"])
+            if index is None:
+                index = manager.build(
+                    company_id,
+                    state["generation"],
+                    state["hybrid"],
+                    self.scroll_all(f"company_{company_id}"),
+                )
+        return index
+
+    def scroll_all(self, collection_name: str) -> List:
+        records = []
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=collection_name,
+                limit=1000,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            records.extend(points)
+            if offset is None:
+                return records
+
+    def search(
+        self,
+        company_id: str,
+        query: str,
+        limit: int = 10,
+        filters: Optional[SearchFilters] = None,
+        diversity: float = 0.0,
+    ):
+        key = self.search_cache.result_key(company_id, query, limit, filters, diversity)
+        results = self.search_cache.results.get(key)
+        if results is not None:
+            return results
+
         collection_name = f"company_{company_id}"
+        query_embedding = self.embed(query)
+        state = self.collection_state(company_id)
+        hybrid = state["hybrid"]
+        fetch = self.fetch_args(hybrid, limit, diversity)
+
+        index = self.local_index(company_id, state)
+        if index is not None:
+            results = self.local_search(index, query, query_embedding, fetch, filters)
+        else:
+            results = self.client.query_points(
+                collection_name=collection_name,
+                **self.query_args(
+                    state, query, query_embedding, fetch["limit"], filters
+                ),
+                with_vectors=fetch["with_vectors"],
+            ).points
+        results = self.finish_search(
+            results, query_embedding, limit, diversity, hybrid
+        )
+
+        self.search_cache.results.set(key, results)
+        return results
 
-        from qdrant_client.models import Filter, FieldCondition, MatchValue
+    def parent_items(self, company_id: str, results) -> Dict[str, Dict]:
+        parent_ids = self.parent_ids(results)
+        if not parent_ids:
+            return {}
+        points = self.client.retrieve(
+            collection_name=f"company_{company_id}",
+            ids=parent_ids,
+            with_payload=["full_data"],
+        )
+        return {str(p.id): (p.payload or {}).get("full_data", {}) for p in points}
+
+    def hydrate(self, company_id: str, results, fields: Optional[List[str]] = None):
+        results = self.merge_parents(results, self.parent_items(company_id, results))
+        item_ids = self.slim_item_ids(results)
+        if not item_ids:
+            return results
+        return self.merge_items(
+            results, self.data_store.get_items(company_id, item_ids, fields)
+        )
+
+    def get_context(
+        self,
+        company_id: str,
+        query: str,
+        limit: int = 10,
+        filters: Optional[SearchFilters] = None,
+        diversity: float = 0.0,
+    ) -> Dict:
+        results = self.hydrate(
+            company_id,
+            self.search(company_id, query, limit, filters, diversity),
+            CONTEXT_FIELDS,
+        )
+        context = self.build_context(results)
+        context["query_embedding"] = self.embed(query)
+        return context
+
+    def get_sprint_context(self, company_id: str, sprint: int, limit: int = 20) -> Dict:
+        collection_name = f"company_{company_id}"
 
         results = self.client.scroll(
             collection_name=collection_name,
@@ -113,6 +595,7 @@ class DataRetriever:
             ),
             limit=limit,
         )[0]
+        results = self.hydrate(company_id, self.collapse(results))
 
         return {
             "formatted_context": self.format_results(results),
@@ -122,8 +605,6 @@ class DataRetriever:
     def get_by_source(self, company_id: str, source: str, limit: int = 10) -> List:
         collection_name = f"company_{company_id}"
 
-        from qdrant_client.models import Filter, FieldCondition, MatchValue
-
         results = self.client.scroll(
             collection_name=collection_name,
             scroll_filter=Filter(
@@ -132,7 +613,7 @@ class DataRetriever:
             limit=limit,
         )[0]
 
-        return results
+        return self.hydrate(company_id, self.collapse(results))
 
     def list_companies(self) -> List[str]:
         collections = self.client.get_collections().collections
@@ -142,3 +623,358 @@ class DataRetriever:
             if c.name.startswith("company_")
         ]
         return companies
+
+
+class AsyncDataRetriever(BaseRetriever):
+    def __init__(
+        self,
+        client: Optional[AsyncQdrantClient] = None,
+        embedder: Optional[ollama.AsyncClient] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        search_cache: Optional[SearchCache] = None,
+        data_store: Optional[AsyncCompanyDataStore] = None,
+        local_indexes: Optional[LocalIndexManager] = None,
+        oversampling: Optional[float] = None,
+    ):
+        self.client = client or AsyncQdrantClient("http://localhost:6333")
+        self.embedder = embedder or ollama.AsyncClient()
+        self.embedding_cache = embedding_cache or EmbeddingCache()
+        self.search_cache = search_cache or SearchCache()
+        self.data_store = data_store or AsyncCompanyDataStore()
+        self.local_indexes = local_indexes
+        self.oversampling = oversampling
+
+    async def embed(self, text: str):
+        key = self.search_cache.normalize(text)
+        embedding = self.search_cache.embeddings.get(key)
+        if embedding is not None:
+            return embedding
+
+        # SQLite lookups run off the event loop; see DataRetriever.embed
+        embedding = await asyncio.to_thread(
+            self.embedding_cache.get, self.embedding_model, text
+        )
+        if embedding is None:
+            result = await self.embedder.embed(model=self.embedding_model, input=text)
+            embedding = result["embeddings"][0]
+
+        self.search_cache.embeddings.set(key, embedding)
+        return embedding
+
+    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings for ``texts``, with all uncached ones in one Ollama call."""
+        found = {}
+        for text in texts:
+            embedding = self.search_cache.embeddings.get(
+                self.search_cache.normalize(text)
+            )
+            if embedding is not None:
+                found[text] = embedding
+
+        missing = list(dict.fromkeys(t for t in texts if t not in found))
+        if missing:
+            cached = await asyncio.to_thread(
+                self.embedding_cache.get_many, self.embedding_model, missing
+            )
+            found.update((t, e) for t, e in zip(missing, cached) if e is not None)
+        uncached = [text for text in missing if text not in found]
+        if uncached:
+            result = await self.embedder.embed(
+                model=self.embedding_model, input=uncached
+            )
+            found.update(zip(uncached, result["embeddings"]))
+
+        for text in missing:
+            self.search_cache.embeddings.set(
+                self.search_cache.normalize(text), found[text]
+            )
+        return [found[text] for text in texts]
+
+    async def collection_state(self, company_id: str) -> Dict:
+        state = self.search_cache.collections.get(company_id)
+        if state is None:
+            info = await self.client.get_collection(f"company_{company_id}")
+            state = self.describe_collection(info)
+            self.search_cache.collections.set(company_id, state)
+        return state
+
+    async def local_index(self, company_id: str, state: Dict) -> Optional[LocalIndex]:
+        manager = self.local_indexes
+        if manager is None:
+            return None
+        if not manager.eligible(state["points"], state["generation"]):
+            return None
+
+        index = manager.resident_index(company_id, state["generation"])
+        if index is not None:
+            return index
+
+        # Snapshot loads and builds are blocking; only one runs per company
+        async with manager.async_build_lock(company_id):
+            index = await asyncio.to_thread(
+                manager.lookup, company_id, state["generation"]
+            )
+            if index is None:
+                records = await self.scroll_all(f"company_{company_id}")
+                index = await asyncio.to_thread(
+                    manager.build,
+                    company_id,
+                    state["generation"],
+                    state["hybrid"],
+                    records,
+                )
+        return index
+
+    async def scroll_all(self, collection_name: str) -> List:
+        records = []
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=collection_name,
+                limit=1000,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            records.extend(points)
+            if offset is None:
+                return records
+
+    async def search(
+        self,
+        company_id: str,
+        query: str,
+        limit: int = 10,
+        filters: Optional[SearchFilters] = None,
+        diversity: float = 0.0,
+    ):
+        key = self.search_cache.result_key(company_id, query, limit, filters, diversity)
+        results = self.search_cache.results.get(key)
+        if results is not None:
+            return results
+
+        collection_name = f"company_{company_id}"
+        query_embedding = await self.embed(query)
+        state = await self.collection_state(company_id)
+        hybrid = state["hybrid"]
+        fetch = self.fetch_args(hybrid, limit, diversity)
+
+        index = await self.local_index(company_id, state)
+        if index is not None:
+            results = self.local_search(index, query, query_embedding, fetch, filters)
+        else:
+            response = await self.client.query_points(
+                collection_name=collection_name,
+                **self.query_args(
+                    state, query, query_embedding, fetch["limit"], filters
+                ),
+                with_vectors=fetch["with_vectors"],
+            )
+            results = response.points
+        results = self.finish_search(
+            results, query_embedding, limit, diversity, hybrid
+        )
+
+        self.search_cache.results.set(key, results)
+        return results
+
+    async def search_batch(
+        self,
+        company_id: str,
+        queries: List[str],
+        limit: int = 10,
+        filters: Optional[SearchFilters] = None,
+        diversity: float = 0.0,
+    ) -> List[List]:
+        """``search`` for many queries at once: the uncached ones are
+        embedded in one call and sent to Qdrant as one batch request."""
+        keys = [
+            self.search_cache.result_key(company_id, query, limit, filters, diversity)
+            for query in queries
+        ]
+        batch = [self.search_cache.results.get(key) for key in keys]
+        pending = [i for i, results in enumerate(batch) if results is None]
+        if not pending:
+            return batch
+
+        embeddings = await self.embed_batch([queries[i] for i in pending])
+        state = await self.collection_state(company_id)
+        hybrid = state["hybrid"]
+        fetch = self.fetch_args(hybrid, limit, diversity)
+
+        index = await self.local_index(company_id, state)
+        if index is not None:
+            found = [
+                self.local_search(index, queries[i], embedding, fetch, filters)
+                for i, embedding in zip(pending, embeddings)
+            ]
+        else:
+            responses = await self.client.query_batch_points(
+                collection_name=f"company_{company_id}",
+                requests=[
+                    self.batch_request(
+                        self.query_args(
+                            state, queries[i], embedding, fetch["limit"], filters
+                        ),
+                        fetch["with_vectors"],
+                    )
+                    for i, embedding in zip(pending, embeddings)
+                ],
+            )
+            found = [response.points for response in responses]
+
+        for i, embedding, results in zip(pending, embeddings, found):
+            batch[i] = self.finish_search(
+                results, embedding, limit, diversity, hybrid
+            )
+            self.search_cache.results.set(keys[i], batch[i])
+        return batch
+
+    async def parent_items(self, company_id: str, results) -> Dict[str, Dict]:
+        parent_ids = self.parent_ids(results)
+        if not parent_ids:
+            return {}
+        points = await self.client.retrieve(
+            collection_name=f"company_{company_id}",
+            ids=parent_ids,
+            with_payload=["full_data"],
+        )
+        return {str(p.id): (p.payload or {}).get("full_data", {}) for p in points}
+
+    async def hydrate(
+        self, company_id: str, results, fields: Optional[List[str]] = None
+    ):
+        results = self.merge_parents(
+            results, await self.parent_items(company_id, results)
+        )
+        item_ids = self.slim_item_ids(results)
+        if not item_ids:
+            return results
+        return self.merge_items(
+            results, await self.data_store.get_items(company_id, item_ids, fields)
+        )
+
+    async def get_context(
+        self,
+        company_id: str,
+        query: str,
+        limit: int = 10,
+        filters: Optional[SearchFilters] = None,
+        diversity: float = 0.0,
+    ) -> Dict:
+        results = await self.hydrate(
+            company_id,
+            await self.search(company_id, query, limit, filters, diversity),
+            CONTEXT_FIELDS,
+        )
+        context = self.build_context(results)
+        context["query_embedding"] = await self.embed(query)
+        return context
+
+    async def get_context_batch(
+        self,
+        company_id: str,
+        queries: List[str],
+        limit: int = 10,
+        filters: Optional[SearchFilters] = None,
+        diversity: float = 0.0,
+    ) -> List[Dict]:
+        batch = await self.search_batch(company_id, queries, limit, filters, diversity)
+        found = [r for results in batch for r in results]
+        parents = await self.parent_items(company_id, found)
+        item_ids = self.slim_item_ids(found)
+        items = {}
+        if item_ids:
+            items = await self.data_store.get_items(
+                company_id, item_ids, CONTEXT_FIELDS
+            )
+
+        contexts = []
+        embeddings = await self.embed_batch(queries)
+        for results, embedding in zip(batch, embeddings):
+            results = self.merge_parents(results, parents)
+            context = self.build_context(self.merge_items(results, items))
+            context["query_embedding"] = embedding
+            contexts.append(context)
+        return contexts
+
+    async def search_companies(
+        self,
+        query: str,
+        companies: Optional[List[str]] = None,
+        limit: int = 10,
+        filters: Optional[SearchFilters] = None,
+        diversity: float = 0.0,
+    ) -> Dict:
+        """Search several companies (all by default) concurrently and merge
+        their hits into one top ``limit``, each paired with its company. A
+        company whose search or hydration fails is reported in ``errors``
+        rather than failing the whole query.
+
+        Hits are merged by their dense cosine similarity to the query, the
+        one score every collection layout shares; fused hybrid scores only
+        rank hits within their own collection."""
+        if companies is None:
+            companies = await self.list_companies()
+
+        # Embedded once here; every shard's search reuses the cached vector
+        await self.embed(query)
+        shards = await asyncio.gather(
+            *(
+                self.search(company_id, query, limit, filters, diversity)
+                for company_id in companies
+            ),
+            return_exceptions=True,
+        )
+
+        hits = []
+        errors = {}
+        for company_id, results in zip(companies, shards):
+            if isinstance(results, Exception):
+                errors[company_id] = str(results)
+            else:
+                hits.extend((company_id, result) for result in results)
+        hits.sort(key=lambda hit: hit[1].payload["similarity"], reverse=True)
+        hits = hits[:limit]
+
+        by_company: Dict[str, List] = {}
+        for company_id, result in hits:
+            by_company.setdefault(company_id, []).append(result)
+        filled = await asyncio.gather(
+            *(self.hydrate(c, results) for c, results in by_company.items()),
+            return_exceptions=True,
+        )
+        # Each company's hits come back in the order they were merged
+        hydrated = {}
+        for company_id, results in zip(by_company, filled):
+            if isinstance(results, Exception):
+                errors[company_id] = str(results)
+            else:
+                hydrated[company_id] = iter(results)
+
+        return {
+            "results": [(c, next(hydrated[c])) for c, _ in hits if c in hydrated],
+            "companies": list(companies),
+            "errors": errors,
+        }
+
+    async def list_companies(self) -> List[str]:
+        collections = (await self.client.get_collections()).collections
+        return [
+            c.name.replace("company_", "")
+            for c in collections
+            if c.name.startswith("company_")
+        ]
+
+    async def legacy_companies(self) -> List[str]:
+        """Companies whose collection has a single unnamed vector and so
+        only gets dense search."""
+        companies = await self.list_companies()
+        states = await asyncio.gather(
+            *(self.collection_state(c) for c in companies), return_exceptions=True
+        )
+        return sorted(
+            c
+            for c, state in zip(companies, states)
+            if isinstance(state, dict) and not state["hybrid"]
+        )
@@ -0,0 +1,69 @@
+import hashlib
+import re
+from collections import Counter
+from typing import List
+
+from qdrant_client.models import SparseVector
+
+# Named vectors in hybrid company collections. Collections created before
+# hybrid search hold a single unnamed dense vector and no sparse one.
+DENSE_VECTOR = "dense"
+SPARSE_VECTOR = "bm25"
+
+# Identifier-like tokens are kept whole (commit hashes, PROJ-123, file paths,
+# max_pool_size) and also split into their parts.
+_TOKEN = re.compile(r"[a-z0-9_]+(?:[./:\-][a-z0-9_]+)*")
+_PARTS = re.compile(r"[./:\-_]")
+
+
+def is_hybrid(collection_info) -> bool:
+    sparse = collection_info.config.params.sparse_vectors or {}
+    return SPARSE_VECTOR in sparse
+
+
+class SparseEncoder:
+    """BM25-style sparse vectors from hashed tokens.
+
+    Document values carry the saturated, length-normalised term frequency;
+    the inverse document frequency is applied by Qdrant through the IDF
+    modifier on the sparse vector, so it stays correct as the collection
+    grows. Query values are plain presence weights.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_length: float = 256.0):
+        self.k1 = k1
+        self.b = b
+        self.avg_length = avg_length
+
+    def tokenize(self, text: str) -> List[str]:
+        tokens = []
+        for token in _TOKEN.findall(text.lower()):
+            tokens.append(token)
+            parts = [part for part in _PARTS.split(token) if part]
+            if len(parts) > 1:
+                tokens.extend(parts)
+        return tokens
+
+    @staticmethod
+    def token_index(token: str) -> int:
+        return int.from_bytes(
+            hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "big"
+        )
+
+    def _vector(self, counts: Counter, weight) -> SparseVector:
+        # Distinct tokens can hash to the same index; their weights add up.
+        values = {}
+        for token, count in counts.items():
+            index = self.token_index(token)
+            values[index] = values.get(index, 0.0) + weight(count)
+        return SparseVector(indices=list(values), values=list(values.values()))
+
+    def encode_document(self, text: str) -> SparseVector:
+        tokens = self.tokenize(text)
+        norm = self.k1 * (1 - self.b + self.b * len(tokens) / self.avg_length)
+        return self._vector(
+            Counter(tokens), lambda tf: tf * (self.k1 + 1) / (tf + norm)
+        )
+
+    def encode_query(self, text: str) -> SparseVector:
+        return self._vector(Counter(set(self.tokenize(text))), lambda tf: 1.0)
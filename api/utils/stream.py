@@ -1,21 +1,26 @@
+import asyncio
 import json
 import traceback
 import uuid
-from typing import Any, Callable, Dict, List, Mapping
+from typing import Any, Callable, Dict, List, Mapping, Optional
 
 from fastapi.responses import StreamingResponse
 from google import genai
 from google.genai import types
 
 
-def stream_text(
+async def stream_text(
     client: genai.Client,
     messages: List[types.Content],
     tool_definitions: List[types.Tool],
     available_tools: Mapping[str, Callable[..., Any]],
     protocol: str = "data",
 ):
-    """Yield Server-Sent Events for a streaming chat completion."""
+    """Yield Server-Sent Events for a streaming chat completion.
+
+    Built on the async Gemini client, so an open stream holds a coroutine
+    rather than a threadpool thread; tools still run in a worker thread.
+    """
     try:
 
         def format_sse(payload: dict) -> str:
@@ -31,7 +36,7 @@ def stream_text(
 
         yield format_sse({"type": "start", "messageId": message_id})
 
-        response = client.models.generate_content_stream(
+        response = await client.aio.models.generate_content_stream(
             model="gemini-2.0-flash",
             contents=messages,
             config=types.GenerateContentConfig(
@@ -39,7 +44,7 @@ def stream_text(
             ),
         )
 
-        for chunk in response:
+        async for chunk in response:
             print(f"[Gemini Response] {chunk}")
             if chunk.candidates:
                 for candidate in chunk.candidates:
@@ -142,7 +147,9 @@ def stream_text(
                     continue
 
                 try:
-                    tool_result = tool_function(**parsed_arguments)
+                    tool_result = await asyncio.to_thread(
+                        tool_function, **parsed_arguments
+                    )
                 except Exception as error:
                     yield format_sse(
                         {
@@ -196,13 +203,29 @@ def stream_text(
         raise
 
 
-def stream_contextual_response(
+async def stream_contextual_response(
     client: genai.Client,
     prompt: str,
     model: str = "gemini-2.5-flash",
     protocol: str = "data",
+    cached_response: Optional[str] = None,
+    on_complete: Optional[Callable[[str], None]] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    on_close: Optional[Callable[[str, Dict[str, Any]], None]] = None,
 ):
-    """Yield Server-Sent Events for a streaming contextual query response."""
+    """Yield Server-Sent Events for a streaming contextual query response.
+
+    When ``cached_response`` is given it is replayed instead of calling
+    Gemini. ``on_complete`` receives the full generated text once the model
+    finishes, unless it stopped at the token limit or a safety filter. ``metadata`` is added to the finish event's message metadata.
+
+    ``on_close`` runs once the stream ends however it ends, including a
+    client disconnect, with the text so far and the finish metadata plus an
+    ``interrupted`` flag. It must not block; the stream is already closing.
+    """
+    text_parts: List[str] = []
+    finish_metadata: Dict[str, Any] = dict(metadata or {})
+    completed = False
     try:
 
         def format_sse(payload: dict) -> str:
@@ -217,12 +240,25 @@ def stream_contextual_response(
 
         yield format_sse({"type": "start", "messageId": message_id})
 
-        response = client.models.generate_content_stream(
+        if cached_response is not None:
+            yield format_sse({"type": "text-start", "id": text_stream_id})
+            yield format_sse(
+                {"type": "text-delta", "id": text_stream_id, "delta": cached_response}
+            )
+            yield format_sse({"type": "text-end", "id": text_stream_id})
+            text_parts.append(cached_response)
+            finish_metadata.update(finishReason="stop", cached=True)
+            yield format_sse({"type": "finish", "messageMetadata": finish_metadata})
+            completed = True
+            yield "data: [DONE]\n\n"
+            return
+
+        response = await client.aio.models.generate_content_stream(
             model=model,
             contents=prompt,
         )
 
-        for chunk in response:
+        async for chunk in response:
             if chunk.candidates:
                 for candidate in chunk.candidates:
                     if candidate.finish_reason:
@@ -236,6 +272,7 @@ def stream_contextual_response(
                                         {"type": "text-start", "id": text_stream_id}
                                     )
                                     text_started = True
+                                text_parts.append(part.text)
                                 yield format_sse(
                                     {
                                         "type": "text-delta",
@@ -247,13 +284,16 @@ def stream_contextual_response(
             if hasattr(chunk, "usage_metadata") and chunk.usage_metadata:
                 usage_data = chunk.usage_metadata
 
+        # Truncated or filtered answers must not be replayed as complete
+        if on_complete is not None and text_parts and finish_reason == "STOP":
+            on_complete("".join(text_parts))
+
         # End text stream if started
         if text_started and not text_finished:
             yield format_sse({"type": "text-end", "id": text_stream_id})
             text_finished = True
 
         # Build finish metadata
-        finish_metadata: Dict[str, Any] = {}
         if finish_reason is not None:
             reason_map = {
                 "STOP": "stop",
@@ -280,11 +320,16 @@ def stream_contextual_response(
             yield format_sse({"type": "finish", "messageMetadata": finish_metadata})
         else:
             yield format_sse({"type": "finish"})
+        completed = True
 
         yield "data: [DONE]\n\n"
     except Exception:
         traceback.print_exc()
         raise
+    finally:
+        if on_close is not None:
+            finish_metadata["interrupted"] = not completed
+            on_close("".join(text_parts), finish_metadata)
 
 
 def patch_response_with_headers(
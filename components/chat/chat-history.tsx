@@ -72,8 +72,8 @@ export function ChatHistory({
     };
 
     const getFirstUserMessage = (session: ChatSession) => {
-        const firstMsg = session.messages.find(m => m.role === "user");
-        return firstMsg ? firstMsg.content.substring(0, 60) + (firstMsg.content.length > 60 ? "..." : "") : "New conversation";
+        const title = session.title;
+        return title ? title.substring(0, 60) + (title.length > 60 ? "..." : "") : "New conversation";
     };
 
     return (
@@ -126,7 +126,7 @@ export function ChatHistory({
                             </div>
                             <div className="flex items-center justify-between mt-1">
                                 <span className="text-xs text-white/50">
-                                    {session.messages.length} messages
+                                    {session.message_count} messages
                                 </span>
                                 <span className="text-xs text-white/50">
                                     {formatDate(session.updated_at)}
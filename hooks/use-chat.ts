@@ -2,7 +2,7 @@
 
 import { useState, useCallback, useEffect } from "react";
 import { getSession, setSession, clearSession } from "@/lib/session-storage";
-import { fetchSessionMessages } from "@/lib/chat-api";
+import { fetchAllSessionMessages } from "@/lib/chat-api";
 
 interface Message {
     id: string;
@@ -45,7 +45,7 @@ export function useChat({ caseId, userId, loadSessionId }: UseChatProps) {
                 try {
                     console.log("Loading session:", sessionIdToLoad);
                     // Load messages from the session
-                    const response = await fetchSessionMessages(sessionIdToLoad);
+                    const response = await fetchAllSessionMessages(sessionIdToLoad);
                     console.log("Session messages response:", response);
 
                     if (response.success && response.messages) {
@@ -211,7 +211,7 @@ export function useChat({ caseId, userId, loadSessionId }: UseChatProps) {
             setError(null);
 
             try {
-                const response = await fetchSessionMessages(loadSessionId);
+                const response = await fetchAllSessionMessages(loadSessionId);
                 if (response.success && response.messages) {
                     const loadedMessages: Message[] = response.messages.map((msg, idx) => ({
                         id: `${loadSessionId}_${idx}`,
@@ -5,6 +5,13 @@
 const API_BASE = process.env.NEXT_PUBLIC_BASE_URL;
 
 export interface ChatMessage {
+    seq: number;
+    role: "user" | "assistant";
+    content: string;
+    timestamp: string;
+}
+
+export interface MessageSummary {
     role: "user" | "assistant";
     content: string;
     timestamp: string;
@@ -14,7 +21,9 @@ export interface ChatSession {
     session_id: string;
     user_id: string;
     company_id: string;
-    messages: ChatMessage[];
+    title?: string;
+    message_count: number;
+    last_message?: MessageSummary;
     created_at: string;
     updated_at: string;
 }
@@ -35,6 +44,8 @@ export interface MessagesResponse {
     success: boolean;
     session_id: string;
     messages: ChatMessage[];
+    next_cursor: number | null;
+    total: number;
 }
 
 /**
@@ -74,10 +85,18 @@ export async function fetchSession(sessionId: string): Promise<SessionResponse>
 }
 
 /**
- * Fetch messages for a specific session
+ * Fetch one page of a session's messages, starting after the `after` cursor
  */
-export async function fetchSessionMessages(sessionId: string): Promise<MessagesResponse> {
-    const url = `${API_BASE}/api/sessions/${sessionId}/messages`;
+export async function fetchSessionMessages(
+    sessionId: string,
+    after?: number,
+    limit: number = 100
+): Promise<MessagesResponse> {
+    const params = new URLSearchParams();
+    if (after !== undefined) params.append("after", after.toString());
+    params.append("limit", limit.toString());
+
+    const url = `${API_BASE}/api/sessions/${sessionId}/messages?${params.toString()}`;
     const response = await fetch(url);
 
     if (!response.ok) {
@@ -86,3 +105,18 @@ export async function fetchSessionMessages(sessionId: string): Promise<MessagesR
 
     return response.json();
 }
+
+/**
+ * Fetch every message of a session, following the pagination cursor
+ */
+export async function fetchAllSessionMessages(sessionId: string): Promise<MessagesResponse> {
+    let page = await fetchSessionMessages(sessionId);
+    const messages = [...(page.messages || [])];
+
+    while (page.success && page.next_cursor !== null) {
+        page = await fetchSessionMessages(sessionId, page.next_cursor);
+        messages.push(...(page.messages || []));
+    }
+
+    return { ...page, messages, next_cursor: null };
+}